@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import {
   StyleSheet,
   View,
@@ -48,19 +48,44 @@ interface RideData {
   ai_suggestion: string;
 }
 
+interface PlaceSuggestion {
+  description: string;
+  place_id?: string;
+}
+
+interface SelectedPlace {
+  description: string;
+  placeId: string;
+  sessionToken: string;
+}
+
+// Places session token: groups the keystrokes of one search with its selection
+const newSessionToken = (): string =>
+  'xxxxxxxx-xxxx-4xxx-yxxx-xxxxxxxxxxxx'.replace(/[xy]/g, (c) => {
+    const r = (Math.random() * 16) | 0;
+    return (c === 'x' ? r : (r & 0x3) | 0x8).toString(16);
+  });
+
 export default function HomeScreen() {
   const [source, setSource] = useState('');
   const [destination, setDestination] = useState('');
   const [loading, setLoading] = useState(false);
   const [rideData, setRideData] = useState<RideData | null>(null);
-  const [sourceSuggestions, setSourceSuggestions] = useState<string[]>([]);
-  const [destSuggestions, setDestSuggestions] = useState<string[]>([]);
+  const [sourceSuggestions, setSourceSuggestions] = useState<PlaceSuggestion[]>([]);
+  const [destSuggestions, setDestSuggestions] = useState<PlaceSuggestion[]>([]);
+  const [sourcePlace, setSourcePlace] = useState<SelectedPlace | null>(null);
+  const [destPlace, setDestPlace] = useState<SelectedPlace | null>(null);
+  const sourceSessionToken = useRef(newSessionToken());
+  const destSessionToken = useRef(newSessionToken());
   const [showSourceSuggestions, setShowSourceSuggestions] = useState(false);
   const [showDestSuggestions, setShowDestSuggestions] = useState(false);
   const [showMap, setShowMap] = useState(true);
 
   useEffect(() => {
     const timeoutId = setTimeout(() => {
+      if (sourcePlace && sourcePlace.description === source) {
+        return;
+      }
       if (source.length > 2) {
         fetchAutocomplete(source, 'source');
       } else {
@@ -73,6 +98,9 @@ export default function HomeScreen() {
 
   useEffect(() => {
     const timeoutId = setTimeout(() => {
+      if (destPlace && destPlace.description === destination) {
+        return;
+      }
       if (destination.length > 2) {
         fetchAutocomplete(destination, 'destination');
       } else {
@@ -85,15 +113,18 @@ export default function HomeScreen() {
 
   const fetchAutocomplete = async (input: string, type: 'source' | 'destination') => {
     try {
+      const sessionToken = type === 'source' ? sourceSessionToken.current : destSessionToken.current;
       const response = await axios.get(`${API_URL}${API_ENDPOINTS.AUTOCOMPLETE}`, {
-        params: { input_text: input },
+        params: { input_text: input, session_token: sessionToken },
       });
-      const suggestions = response.data.suggestions?.slice(0, 5) || [];
+      const suggestions: PlaceSuggestion[] = (response.data.suggestions?.slice(0, 5) || []).map(
+        (s: any) => (typeof s === 'string' ? { description: s } : { description: s.description, place_id: s.place_id })
+      );
       if (type === 'source') {
-        setSourceSuggestions(suggestions.map((s: any) => s.description || s));
+        setSourceSuggestions(suggestions);
         setShowSourceSuggestions(true);
       } else {
-        setDestSuggestions(suggestions.map((s: any) => s.description || s));
+        setDestSuggestions(suggestions);
         setShowDestSuggestions(true);
       }
     } catch (error: any) {
@@ -119,9 +150,19 @@ export default function HomeScreen() {
     setShowMap(true);
 
     try {
+      // Book with the selected place IDs so the server can skip geocoding
+      const usePlace = (place: SelectedPlace | null, text: string) =>
+        place && place.description === text ? place : null;
+      const pickup = usePlace(sourcePlace, source);
+      const dropoff = usePlace(destPlace, destination);
       const response = await axios.post(
         `${API_URL}${API_ENDPOINTS.BOOK_RIDE}`,
-        { source, destination },
+        {
+          source: pickup ? `place_id:${pickup.placeId}` : source,
+          destination: dropoff ? `place_id:${dropoff.placeId}` : destination,
+          source_session_token: pickup?.sessionToken,
+          destination_session_token: dropoff?.sessionToken,
+        },
         { headers: { 'Content-Type': 'application/json' } }
       );
       setRideData(response.data);
@@ -133,14 +174,29 @@ export default function HomeScreen() {
     }
   };
 
-  const selectSuggestion = (suggestion: string, type: 'source' | 'destination') => {
+  const selectSuggestion = (suggestion: PlaceSuggestion, type: 'source' | 'destination') => {
+    const tokenRef = type === 'source' ? sourceSessionToken : destSessionToken;
+    const place = suggestion.place_id
+      ? { description: suggestion.description, placeId: suggestion.place_id, sessionToken: tokenRef.current }
+      : null;
     if (type === 'source') {
-      setSource(suggestion);
+      setSourcePlace(place);
+      setSource(suggestion.description);
       setShowSourceSuggestions(false);
     } else {
-      setDestination(suggestion);
+      setDestPlace(place);
+      setDestination(suggestion.description);
       setShowDestSuggestions(false);
     }
+    if (place) {
+      // Resolve the selection now (ending the Places session) so booking needs no geocoding
+      axios
+        .get(`${API_URL}${API_ENDPOINTS.PLACE_DETAILS}`, {
+          params: { place_id: place.placeId, session_token: place.sessionToken },
+        })
+        .catch((error) => console.error('Place details error:', error));
+    }
+    tokenRef.current = newSessionToken();
   };
 
   const getWeatherIcon = (condition: string, temp: number) => {
@@ -266,7 +322,7 @@ export default function HomeScreen() {
                     onPress={() => selectSuggestion(suggestion, 'source')}
                   >
                     <IconSymbol name="mappin.circle.fill" size={20} color="#000" />
-                    <ThemedText style={styles.suggestionText}>{suggestion}</ThemedText>
+                    <ThemedText style={styles.suggestionText}>{suggestion.description}</ThemedText>
                   </TouchableOpacity>
                 ))}
               </View>
@@ -281,7 +337,7 @@ export default function HomeScreen() {
                     onPress={() => selectSuggestion(suggestion, 'destination')}
                   >
                     <IconSymbol name="mappin.circle" size={20} color="#000" />
-                    <ThemedText style={styles.suggestionText}>{suggestion}</ThemedText>
+                    <ThemedText style={styles.suggestionText}>{suggestion.description}</ThemedText>
                   </TouchableOpacity>
                 ))}
               </View>
@@ -32,6 +32,7 @@ export const API_ENDPOINTS = {
   PRICE_ESTIMATES: '/price-estimates',
   TIME_ESTIMATES: '/time-estimates',
   AUTOCOMPLETE: '/autocomplete',
+  PLACE_DETAILS: '/place-details',
 } as const;
 
 
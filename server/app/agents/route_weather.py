@@ -0,0 +1,255 @@
+"""
+Route weather - weather sampled along the trip polyline
+
+The route is sampled at distance intervals, samples are mapped to weather
+tiles on a fixed lat/lng grid, and only the unique tiles are fetched. The
+number of samples is capped, so a 300 km trip costs the same handful of
+upstream calls as a 30 km one. The destination's tile is read at the
+destination itself rather than the tile centre, so that reading doubles as
+the destination weather.
+"""
+import contextvars
+import math
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from itertools import accumulate
+from typing import Dict, List, Optional, Tuple
+from googlemaps.convert import decode_polyline
+from app.agents.travel_agent import get_weather_at
+from app.core.config import Config
+from app.core.resilience import DeadlineExceeded, remaining_budget
+
+EARTH_RADIUS_KM = 6371.0088
+
+Tile = Tuple[int, int]
+
+# Each tile fetch may take two upstream threads when hedged
+_executor = ThreadPoolExecutor(
+    max_workers=Config.ROUTE_WEATHER_MAX_WORKERS or max(Config.UPSTREAM_MAX_WORKERS // 2, 1),
+    thread_name_prefix="route-weather"
+)
+
+
+def _haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two coordinates in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def sample_polyline(
+    polyline: str,
+    interval_km: float,
+    max_samples: int
+) -> List[Tuple[float, float, float]]:
+    """
+    Sample points along an encoded polyline at distance intervals
+
+    The interval is widened when needed so at most ``max_samples`` points
+    are returned, always including the start and end of the route.
+
+    Args:
+        polyline: Encoded Google polyline
+        interval_km: Preferred spacing between samples in kilometres
+        max_samples: Upper bound on the number of samples
+
+    Returns:
+        list: (lat, lng, distance_km) tuples ordered along the route
+    """
+    points = decode_polyline(polyline)
+    if not points:
+        return []
+    if len(points) == 1 or max_samples < 2:
+        return [(points[0]['lat'], points[0]['lng'], 0.0)]
+
+    lats = [p['lat'] for p in points]
+    lngs = [p['lng'] for p in points]
+    segments = map(_haversine_km, lats, lngs, lats[1:], lngs[1:])
+    cumulative = list(accumulate(segments, initial=0.0))
+    total_km = cumulative[-1]
+
+    step = float(max(interval_km, total_km / (max_samples - 1), 1e-9))
+    count = min(max_samples, int(total_km / step) + 2)
+    targets = [min(i * step, total_km) for i in range(count - 1)] + [total_km]
+
+    samples = []
+    for target in targets:
+        # Interpolate within the segment that contains the target distance
+        j = max(1, min(bisect_left(cumulative, target), len(cumulative) - 1))
+        span = cumulative[j] - cumulative[j - 1]
+        t = (target - cumulative[j - 1]) / span if span else 0.0
+        samples.append((
+            lats[j - 1] + t * (lats[j] - lats[j - 1]),
+            lngs[j - 1] + t * (lngs[j] - lngs[j - 1]),
+            target
+        ))
+    return samples
+
+
+def to_tile(lat: float, lng: float, tile_degrees: float) -> Tile:
+    """Map a coordinate to its weather tile on a fixed lat/lng grid"""
+    return math.floor(lat / tile_degrees), math.floor(lng / tile_degrees)
+
+
+def tile_center(tile: Tile, tile_degrees: float) -> Tuple[float, float]:
+    """Return the coordinate at the centre of a weather tile"""
+    return (tile[0] + 0.5) * tile_degrees, (tile[1] + 0.5) * tile_degrees
+
+
+class TileWeatherCache:
+    """Bounded TTL cache of weather per tile"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[Tile, Tuple[float, Tuple[str, float]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, tile: Tile) -> Optional[Tuple[str, float]]:
+        """Return cached weather for a tile if still fresh"""
+        with self._lock:
+            entry = self._entries.get(tile)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def put(self, tile: Tile, weather: Tuple[str, float]):
+        """Store weather for a tile, evicting the oldest entry when full"""
+        with self._lock:
+            if tile not in self._entries and len(self._entries) >= self.max_entries:
+                oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                del self._entries[oldest]
+            self._entries[tile] = (time.monotonic(), weather)
+
+    def stats(self) -> Dict:
+        """Return hit counters and size of the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "size": len(self._entries)
+            }
+
+
+_tile_cache = TileWeatherCache(
+    ttl_seconds=Config.ROUTE_WEATHER_CACHE_SECONDS,
+    max_entries=Config.ROUTE_WEATHER_CACHE_ENTRIES
+)
+
+
+def tile_cache_stats() -> Dict:
+    """Return hit counters and size of the weather tile cache"""
+    return _tile_cache.stats()
+
+
+def get_route_weather(polyline: str) -> Tuple[List[Dict], Optional[Tuple[str, float]]]:
+    """
+    Get weather for the distinct tiles a route passes through
+
+    Tiles that do not arrive within the request budget are left out.
+    The last entry is the destination, read at the route's end point.
+
+    Args:
+        polyline: Encoded overview polyline of the route
+
+    Returns:
+        tuple: (route_weather, destination_weather) where route_weather has
+        one dict per unique tile with distance_km, lat, lng, condition and
+        temperature, ordered along the route, and destination_weather is
+        (condition, temperature) at the destination or None
+    """
+    if not polyline or not Config.OPENWEATHER_API_KEY:
+        return [], None
+
+    try:
+        samples = sample_polyline(
+            polyline,
+            Config.ROUTE_WEATHER_INTERVAL_KM,
+            # At least two samples, so the last one is always the route end
+            max(Config.ROUTE_WEATHER_MAX_SAMPLES, 2)
+        )
+    except Exception as e:
+        print(f"Error sampling route polyline: {e}")
+        return [], None
+    if not samples:
+        return [], None
+
+    tile_degrees = Config.ROUTE_WEATHER_TILE_DEGREES
+    end_lat, end_lng, end_km = samples[-1]
+    destination_tile = to_tile(end_lat, end_lng, tile_degrees)
+    first_seen: Dict[Tile, float] = {}
+    for lat, lng, distance_km in samples:
+        tile = to_tile(lat, lng, tile_degrees)
+        if tile != destination_tile:
+            first_seen.setdefault(tile, distance_km)
+
+    weather: Dict[Tile, Tuple[str, float]] = {}
+    # Not cached by tile: a tile-level reading can be far from the destination
+    destination_future = _executor.submit(
+        contextvars.copy_context().run,
+        get_weather_at,
+        end_lat,
+        end_lng
+    )
+    pending = {}
+    for tile in first_seen:
+        cached = _tile_cache.get(tile)
+        if cached is not None:
+            weather[tile] = cached
+        else:
+            pending[tile] = _executor.submit(
+                contextvars.copy_context().run,
+                get_weather_at,
+                *tile_center(tile, tile_degrees)
+            )
+
+    for tile, future in pending.items():
+        try:
+            result = future.result(timeout=remaining_budget())
+        except (DeadlineExceeded, FutureTimeoutError):
+            future.cancel()
+            continue
+        if result is not None:
+            _tile_cache.put(tile, result)
+            weather[tile] = result
+
+    route_weather = []
+    for tile, distance_km in first_seen.items():
+        if tile not in weather:
+            continue
+        lat, lng = tile_center(tile, tile_degrees)
+        condition, temperature = weather[tile]
+        route_weather.append({
+            "distance_km": round(distance_km, 1),
+            "lat": round(lat, 4),
+            "lng": round(lng, 4),
+            "condition": condition,
+            "temperature": temperature
+        })
+
+    try:
+        destination_weather = destination_future.result(timeout=remaining_budget())
+    except (DeadlineExceeded, FutureTimeoutError):
+        destination_future.cancel()
+        destination_weather = None
+    if destination_weather is not None:
+        condition, temperature = destination_weather
+        route_weather.append({
+            "distance_km": round(end_km, 1),
+            "lat": round(end_lat, 4),
+            "lng": round(end_lng, 4),
+            "condition": condition,
+            "temperature": temperature
+        })
+    return route_weather, destination_weather
@@ -5,7 +5,10 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import PromptTemplate
 import requests
 from app.core.config import Config
-from typing import Tuple
+from app.core.resilience import call_upstream, http_get
+from typing import Dict, List, Optional, Tuple
+
+OPENWEATHER_URL = "http://api.openweathermap.org/data/2.5/weather"
 
 def get_weather(city_name: str) -> Tuple[str, float]:
     """
@@ -23,8 +26,9 @@ def get_weather(city_name: str) -> Tuple[str, float]:
         return "clear sky", 20.0
     
     try:
-        url = f"http://api.openweathermap.org/data/2.5/weather?q={city_name}&appid={api_key}&units=metric"
-        response = requests.get(url, timeout=5)
+        url = OPENWEATHER_URL
+        params = {"q": city_name, "appid": api_key, "units": "metric"}
+        response = http_get("openweather", url, params=params)
         response.raise_for_status()
         data = response.json()
         
@@ -40,12 +44,51 @@ def get_weather(city_name: str) -> Tuple[str, float]:
         print(f"Unexpected error getting weather: {e}")
         return "clear sky", 20.0
 
+def get_weather_at(lat: float, lng: float) -> Optional[Tuple[str, float]]:
+    """
+    Get weather information for a coordinate
+    
+    Args:
+        lat: Latitude coordinate
+        lng: Longitude coordinate
+    
+    Returns:
+        tuple: (weather_description, temperature), or None if unavailable
+    """
+    api_key = Config.OPENWEATHER_API_KEY
+    if not api_key:
+        return None
+    
+    try:
+        url = OPENWEATHER_URL
+        params = {"lat": lat, "lon": lng, "appid": api_key, "units": "metric"}
+        response = http_get("openweather", url, params=params)
+        response.raise_for_status()
+        data = response.json()
+        
+        if data.get("weather"):
+            return data["weather"][0]["description"], data["main"]["temp"]
+        return None
+    except Exception as e:
+        print(f"Error fetching weather at ({lat}, {lng}): {e}")
+        return None
+
+def _describe_route_weather(route_weather: Optional[List[Dict]]) -> str:
+    """Summarize route weather samples as one line of text"""
+    if not route_weather:
+        return ""
+    return "; ".join(
+        f"{sample['distance_km']} km: {sample['condition']}, {sample['temperature']}°C"
+        for sample in route_weather
+    )
+
 def get_travel_suggestion(
     source: str,
     destination: str,
     duration: str,
     weather_desc: str,
-    temp: float
+    temp: float,
+    route_weather: Optional[List[Dict]] = None
 ) -> str:
     """
     Get AI-powered travel suggestion
@@ -56,24 +99,26 @@ def get_travel_suggestion(
         duration: Trip duration
         weather_desc: Weather description
         temp: Temperature in Celsius
+        route_weather: Optional weather samples along the route
     
     Returns:
         str: AI-generated travel suggestion
     """
+    route_summary = _describe_route_weather(route_weather)
+    fallback = f"Traveling from {source} to {destination} will take {duration}. Weather at destination: {weather_desc}, {temp}°C."
+    if route_summary:
+        fallback += f" Along the way: {route_summary}."
+    fallback += " Dress appropriately and enjoy your ride! 🚕"
+    
     if not Config.GEMINI_API_KEY:
-        return f"Traveling from {source} to {destination} will take {duration}. Weather at destination: {weather_desc}, {temp}°C. Dress appropriately and enjoy your ride! 🚕"
+        return fallback
     
     try:
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-1.5-flash",  # Updated model name
-            temperature=0.7,
-            google_api_key=Config.GEMINI_API_KEY
-        )
-        
         template = """
         I am booking a cab from {source} to {destination}. 
         The trip will take {duration}.
         The weather at the destination is {weather_desc} with a temperature of {temp}°C.
+        Conditions along the route (distance from start): {route_weather}
         
         Please act as a travel assistant and provide SPECIFIC, ACTIONABLE advice:
         
@@ -99,19 +144,33 @@ def get_travel_suggestion(
         """
         
         prompt = PromptTemplate(
-            input_variables=["source", "destination", "duration", "weather_desc", "temp"],
+            input_variables=["source", "destination", "duration", "weather_desc", "temp", "route_weather"],
             template=template
         )
         
-        chain = prompt | llm
-        response = chain.invoke({
+        inputs = {
             "source": source,
             "destination": destination,
             "duration": duration,
             "weather_desc": weather_desc,
-            "temp": temp
-        })
+            "temp": temp,
+            "route_weather": route_summary or "not available"
+        }
+        
+        def invoke(timeout: float):
+            llm = ChatGoogleGenerativeAI(
+                model="gemini-1.5-flash",  # Updated model name
+                temperature=0.7,
+                google_api_key=Config.GEMINI_API_KEY,
+                timeout=timeout,
+                max_retries=0
+            )
+            chain = prompt | llm
+            return chain.invoke(inputs)
+        
+        # Not hedged: duplicate LLM calls are billed
+        response = call_upstream("gemini", invoke, timeout=Config.LLM_TIMEOUT_SECONDS)
         return response.content
     except Exception as e:
         print(f"Error getting AI suggestion: {e}")
-        return f"Traveling from {source} to {destination} will take {duration}. Weather at destination: {weather_desc}, {temp}°C. Dress appropriately and enjoy your ride! 🚕"
\ No newline at end of file
+        return fallback
\ No newline at end of file
@@ -1,20 +1,39 @@
 """
 API routes for Uber AI Clone
 """
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional, List
-from app.core.gmaps import get_gmaps_service
+from app.core.config import Config
+from app.core.gmaps import get_gmaps_service, is_place_reference
+from app.core.hot_routes import get_hot_route_table
+from app.core.idempotency import (
+    IdempotencyKeyReuseError,
+    derive_idempotency_key,
+    get_idempotency_store,
+    request_fingerprint,
+)
+from app.core.resilience import request_deadline, upstream_stats
 from app.core.uber_api import get_uber_service
+from app.agents.route_weather import get_route_weather, tile_cache_stats
 from app.agents.travel_agent import get_weather, get_travel_suggestion
 
 router = APIRouter()
 
 class RideRequest(BaseModel):
-    """Request model for booking a ride"""
+    """
+    Request model for booking a ride
+    
+    source and destination are free text or ``place_id:<id>`` references
+    to autocomplete suggestions; the session tokens are those used while
+    searching for each of them.
+    """
     source: str
     destination: str
     product_id: Optional[str] = None
+    source_session_token: Optional[str] = None
+    destination_session_token: Optional[str] = None
 
 class LocationRequest(BaseModel):
     """Request model for location-based queries"""
@@ -27,73 +46,155 @@ async def health_check():
     return {"status": "ok", "message": "Uber AI Clone API v1"}
 
 @router.post("/book-ride")
-async def book_ride(request: RideRequest):
+async def book_ride(
+    request: RideRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     """
     Book a ride with AI-powered travel suggestions
     
+    Retries carrying the same Idempotency-Key header (or, without one, the
+    same trip within the current time bucket) attach to the in-flight
+    computation or replay its stored result.
+    
     Args:
         request: RideRequest with source and destination
+        response: Outgoing response, used to flag replayed results
+        idempotency_key: Optional client-supplied idempotency key
     
     Returns:
         dict: Ride details, weather info, and AI suggestions
     """
     try:
-        # Get Google Maps service
-        gmaps = get_gmaps_service()
-        
-        # Get directions
-        directions = gmaps.get_directions(request.source, request.destination)
-        if not directions:
-            raise HTTPException(
-                status_code=404, 
-                detail=f"Route not found between {request.source} and {request.destination}"
+        fingerprint = request_fingerprint(
+            request.source,
+            request.destination,
+            request.product_id
+        )
+        if idempotency_key:
+            key = f"client:{idempotency_key}"
+        else:
+            key = derive_idempotency_key(
+                request.source,
+                request.destination,
+                request.product_id
             )
         
-        # Geocode addresses for Uber API
-        start_location = gmaps.geocode(request.source)
-        end_location = gmaps.geocode(request.destination)
+        result, replayed = await get_idempotency_store().run(
+            key,
+            fingerprint,
+            lambda: run_in_threadpool(_plan_ride, request)
+        )
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
+        return result
+    except IdempotencyKeyReuseError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        # API key not set or service not initialized
+        raise HTTPException(status_code=500, detail=f"Configuration error: {str(e)}")
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
+    except Exception as e:
+        print(f"Error booking ride: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Internal server error: {str(e)}"
+        )
+
+def _plan_ride(request: RideRequest) -> dict:
+    """
+    Run the directions, Uber, weather and AI chain for a booking
+    
+    All upstream calls share one latency budget of REQUEST_BUDGET_SECONDS.
+    
+    Args:
+        request: RideRequest with source and destination
+    
+    Returns:
+        dict: Ride details, weather info, and AI suggestions
+    """
+    with request_deadline(Config.REQUEST_BUDGET_SECONDS):
+        # Serve frequent routes from the precomputed hot-route table
+        hot_route = None
+        if Config.HOT_ROUTES_ENABLED:
+            hot_routes = get_hot_route_table()
+            hot_routes.record(request.source, request.destination)
+            hot_route = hot_routes.lookup(request.source, request.destination)
+        
+        if hot_route is not None:
+            directions = hot_route.directions
+            start_location = hot_route.start_location
+            end_location = hot_route.end_location
+            uber_prices = hot_route.uber_prices
+        else:
+            # Get Google Maps service
+            gmaps = get_gmaps_service()
+            
+            # Get directions
+            directions = gmaps.get_directions(request.source, request.destination)
+            if not directions:
+                raise HTTPException(
+                    status_code=404, 
+                    detail=f"Route not found between {request.source} and {request.destination}"
+                )
+            
+            # Geocode addresses for Uber API
+            # Place references resolve from the place cache filled on selection
+            start_location = gmaps.geocode(request.source, request.source_session_token)
+            end_location = gmaps.geocode(request.destination, request.destination_session_token)
+            uber_prices = None
         
-        # Get Uber price estimates if coordinates are available
-        uber_prices = None
+        # Get Uber estimates if coordinates are available; pickup times are
+        # always live, fares are reused from the hot-route table when present
         uber_times = None
         if start_location and end_location:
             uber_service = get_uber_service()
-            uber_prices = uber_service.get_price_estimates(
-                start_location['lat'],
-                start_location['lng'],
-                end_location['lat'],
-                end_location['lng']
-            )
+            if uber_prices is None:
+                uber_prices = uber_service.get_price_estimates(
+                    start_location.lat,
+                    start_location.lng,
+                    end_location.lat,
+                    end_location.lng
+                )
             uber_times = uber_service.get_time_estimates(
-                start_location['lat'],
-                start_location['lng']
+                start_location.lat,
+                start_location.lng
             )
         
-        # Get weather for destination
-        weather_desc, temp = get_weather(request.destination)
+        # Place references are opaque IDs; describe them by their addresses
+        source = directions.start_address if is_place_reference(request.source) else request.source
+        destination = directions.end_address if is_place_reference(request.destination) else request.destination
+        
+        # Get weather along the route, including a reading at the destination
+        route_weather, destination_weather = get_route_weather(directions.polyline)
+        
+        # Get weather for destination unless the route already covered it
+        if destination_weather is not None:
+            weather_desc, temp = destination_weather
+        else:
+            weather_desc, temp = get_weather(destination)
         
         # Get AI travel suggestion
         suggestion = get_travel_suggestion(
-            request.source,
-            request.destination,
-            directions['duration'],
+            source,
+            destination,
+            directions.duration,
             weather_desc,
-            temp
+            temp,
+            route_weather
         )
         
         return {
-            "ride_details": {
-                "distance": directions['distance'],
-                "distance_meters": directions['distance_meters'],
-                "duration": directions['duration'],
-                "duration_seconds": directions['duration_seconds'],
-                "start_address": directions['start_address'],
-                "end_address": directions['end_address'],
-                "polyline": directions['polyline']
-            },
+            "ride_details": directions.to_dict(),
             "weather_report": {
                 "condition": weather_desc,
-                "temperature": temp
+                "temperature": temp,
+                "route": route_weather
             },
             "uber_estimates": {
                 "prices": uber_prices or [],
@@ -101,20 +202,46 @@ async def book_ride(request: RideRequest):
             },
             "ai_suggestion": suggestion
         }
-    except ValueError as e:
-        # API key not set or service not initialized
-        raise HTTPException(status_code=500, detail=f"Configuration error: {str(e)}")
-    except HTTPException:
-        # Re-raise HTTP exceptions
-        raise
-    except Exception as e:
-        print(f"Error booking ride: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(
-            status_code=500, 
-            detail=f"Internal server error: {str(e)}"
-        )
+
+@router.get("/hot-routes")
+async def get_hot_routes():
+    """
+    Get hot-route table metrics
+    
+    Returns:
+        dict: Hit ratio, freshness and the currently precomputed routes
+    """
+    return get_hot_route_table().stats()
+
+@router.get("/caches")
+async def get_caches():
+    """
+    Get cache efficiency metrics
+    
+    Returns:
+        dict: Hit counters and sizes of the place cache, the route weather
+        tile cache and the booking idempotency store
+    """
+    try:
+        places = get_gmaps_service().places.stats()
+    except ValueError:
+        # Google Maps not configured, so no place cache exists
+        places = None
+    return {
+        "places": places,
+        "route_weather_tiles": tile_cache_stats(),
+        "idempotency": get_idempotency_store().stats()
+    }
+
+@router.get("/upstreams")
+async def get_upstreams():
+    """
+    Get upstream resilience metrics
+    
+    Returns:
+        dict: Circuit state, latency percentiles and hedging counters per upstream
+    """
+    return upstream_stats()
 
 @router.get("/products")
 async def get_products(
@@ -133,8 +260,10 @@ async def get_products(
     """
     try:
         uber_service = get_uber_service()
-        products = uber_service.get_products(latitude, longitude)
-        return {"products": products or []}
+        # Forward the upstream body as-is instead of decoding and re-encoding it;
+        # the blocking upstream call runs off the event loop
+        products = await run_in_threadpool(uber_service.get_products_raw, latitude, longitude)
+        return Response(content=products, media_type="application/json")
     except Exception as e:
         print(f"Error getting products: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -160,13 +289,14 @@ async def get_price_estimates(
     """
     try:
         uber_service = get_uber_service()
-        prices = uber_service.get_price_estimates(
+        prices = await run_in_threadpool(
+            uber_service.get_price_estimates_raw,
             start_latitude,
             start_longitude,
             end_latitude,
             end_longitude
         )
-        return {"prices": prices or []}
+        return Response(content=prices, media_type="application/json")
     except Exception as e:
         print(f"Error getting price estimates: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -190,31 +320,39 @@ async def get_time_estimates(
     """
     try:
         uber_service = get_uber_service()
-        times = uber_service.get_time_estimates(latitude, longitude, product_id)
-        return {"times": times or []}
+        times = await run_in_threadpool(
+            uber_service.get_time_estimates_raw,
+            latitude,
+            longitude,
+            product_id
+        )
+        return Response(content=times, media_type="application/json")
     except Exception as e:
         print(f"Error getting time estimates: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/autocomplete")
 async def get_autocomplete(
-    input_text: str = Query(..., description="Partial address or place name")
+    input_text: str = Query(..., description="Partial address or place name"),
+    session_token: Optional[str] = Query(None, description="Places session token for this search")
 ):
     """
     Get place autocomplete suggestions
     
     Args:
         input_text: Partial address or place name
+        session_token: Optional Places session token shared by one search
     
     Returns:
-        List of place suggestions
+        List of place suggestions, each with its place_id
     """
     try:
         if not input_text or len(input_text) < 2:
             return {"suggestions": []}
         
         gmaps = get_gmaps_service()
-        suggestions = gmaps.get_place_autocomplete(input_text)
+        # Blocking client call; keep it off the event loop
+        suggestions = await run_in_threadpool(gmaps.get_place_autocomplete, input_text, session_token)
         return {"suggestions": suggestions}
     except ValueError as e:
         # API key not set or service not initialized
@@ -229,3 +367,43 @@ async def get_autocomplete(
             detail=f"Error fetching autocomplete suggestions: {str(e)}"
         )
 
+@router.get("/place-details")
+async def get_place_details(
+    place_id: str = Query(..., description="Place ID of the selected suggestion"),
+    session_token: Optional[str] = Query(None, description="Places session token of the search")
+):
+    """
+    Resolve a selected autocomplete suggestion to coordinates
+    
+    Clients call this when a suggestion is selected, which ends the Places
+    session and caches the coordinates so booking with ``place_id:<id>``
+    needs no geocode round-trip.
+    
+    Args:
+        place_id: Place ID of the selected suggestion
+        session_token: Optional Places session token of the search
+    
+    Returns:
+        dict: Place ID, coordinates and formatted address
+    """
+    try:
+        gmaps = get_gmaps_service()
+        # Blocking client call; keep it off the event loop
+        location = await run_in_threadpool(gmaps.resolve_place, place_id, session_token)
+        if location is None:
+            raise HTTPException(status_code=404, detail=f"Place not found: {place_id}")
+        return {
+            "place_id": place_id,
+            "lat": location.lat,
+            "lng": location.lng,
+            "formatted_address": location.formatted_address
+        }
+    except ValueError as e:
+        # API key not set or service not initialized
+        print(f"Configuration error: {e}")
+        raise HTTPException(status_code=500, detail="Google Maps API not configured")
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error getting place details: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
@@ -6,6 +6,10 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+def _upstream_workers_needed(threadpool_size: int, max_fan_out: int) -> int:
+    """Upstream threads for every request thread at its widest fan-out, hedged"""
+    return threadpool_size * max(max_fan_out, 1) * 2
+
 class Config:
     """Application configuration"""
     
@@ -33,9 +37,78 @@ class Config:
     SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
     SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
     
+    # "development" runs one process with the auto-reloader; "production"
+    # runs a tuned multi-worker server
+    SERVER_MODE = os.getenv("SERVER_MODE", "development").lower()
+    WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "0"))  # 0 = one worker per CPU
+    SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", "2048"))
+    SERVER_KEEPALIVE_SECONDS = int(os.getenv("SERVER_KEEPALIVE_SECONDS", "75"))
+    SERVER_GRACEFUL_SHUTDOWN_SECONDS = int(os.getenv("SERVER_GRACEFUL_SHUTDOWN_SECONDS", "30"))
+    SERVER_THREADPOOL_SIZE = int(os.getenv("SERVER_THREADPOOL_SIZE", "64"))
+    SERVER_ACCESS_LOG = os.getenv("SERVER_ACCESS_LOG", "false").lower() == "true"
+    
     # CORS Configuration
     CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",")
     
+    # Booking idempotency (retry deduplication and result replay)
+    IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "300"))
+    IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "1024"))
+    IDEMPOTENCY_BUCKET_SECONDS = int(os.getenv("IDEMPOTENCY_BUCKET_SECONDS", "60"))
+    
+    # Hot-route precomputation for the most frequent origin/destination pairs
+    HOT_ROUTES_ENABLED = os.getenv("HOT_ROUTES_ENABLED", "true").lower() == "true"
+    HOT_ROUTES_TOP_K = int(os.getenv("HOT_ROUTES_TOP_K", "20"))
+    HOT_ROUTES_MIN_COUNT = int(os.getenv("HOT_ROUTES_MIN_COUNT", "3"))
+    HOT_ROUTES_REFRESH_SECONDS = int(os.getenv("HOT_ROUTES_REFRESH_SECONDS", "300"))
+    HOT_ROUTES_MAX_AGE_SECONDS = int(os.getenv("HOT_ROUTES_MAX_AGE_SECONDS", "900"))
+    # Routes precomputed at startup, as "origin|destination" pairs separated by ";"
+    HOT_ROUTES_SEED = [
+        tuple(part.strip() for part in pair.split("|", 1))
+        for pair in os.getenv("HOT_ROUTES_SEED", "").split(";")
+        if "|" in pair
+    ]
+    
+    # Weather sampling along the route polyline
+    ROUTE_WEATHER_INTERVAL_KM = float(os.getenv("ROUTE_WEATHER_INTERVAL_KM", "25"))
+    ROUTE_WEATHER_MAX_SAMPLES = int(os.getenv("ROUTE_WEATHER_MAX_SAMPLES", "4"))
+    ROUTE_WEATHER_TILE_DEGREES = float(os.getenv("ROUTE_WEATHER_TILE_DEGREES", "0.25"))
+    ROUTE_WEATHER_CACHE_SECONDS = int(os.getenv("ROUTE_WEATHER_CACHE_SECONDS", "600"))
+    ROUTE_WEATHER_CACHE_ENTRIES = int(os.getenv("ROUTE_WEATHER_CACHE_ENTRIES", "2048"))
+    # Threads fetching tiles; 0 = half of UPSTREAM_MAX_WORKERS
+    ROUTE_WEATHER_MAX_WORKERS = int(os.getenv("ROUTE_WEATHER_MAX_WORKERS", "0"))
+    
+    # Place details resolved from autocomplete selections
+    PLACE_CACHE_TTL_SECONDS = int(os.getenv("PLACE_CACHE_TTL_SECONDS", "86400"))
+    PLACE_CACHE_MAX_ENTRIES = int(os.getenv("PLACE_CACHE_MAX_ENTRIES", "10000"))
+    
+    # Upstream resilience: latency budget, timeouts, hedging and circuit breakers
+    REQUEST_BUDGET_SECONDS = float(os.getenv("REQUEST_BUDGET_SECONDS", "12"))
+    UPSTREAM_TIMEOUT_SECONDS = float(os.getenv("UPSTREAM_TIMEOUT_SECONDS", "5"))
+    LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "8"))
+    # Upstream pool threads; 0 sizes the pool from SERVER_THREADPOOL_SIZE so
+    # calls never queue behind each other (the route weather tiles are the
+    # widest per-request fan-out)
+    UPSTREAM_MAX_WORKERS = int(os.getenv("UPSTREAM_MAX_WORKERS", "0")) or _upstream_workers_needed(
+        SERVER_THREADPOOL_SIZE, ROUTE_WEATHER_MAX_SAMPLES
+    )
+    HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+    
+    @classmethod
+    def is_production(cls) -> bool:
+        """Whether the server runs in production mode"""
+        return cls.SERVER_MODE == "production"
+    
+    @classmethod
+    def server_workers(cls) -> int:
+        """Number of worker processes: WEB_CONCURRENCY or the usable CPU count"""
+        if cls.WEB_CONCURRENCY > 0:
+            return cls.WEB_CONCURRENCY
+        if hasattr(os, "sched_getaffinity"):
+            return max(len(os.sched_getaffinity(0)), 1)
+        return os.cpu_count() or 1
+    
     @classmethod
     def validate(cls):
         """Validate that required API keys are present"""
@@ -51,5 +124,13 @@ class Config:
         if missing:
             print(f"Warning: Missing API keys: {', '.join(missing)}")
         
+        needed = _upstream_workers_needed(cls.SERVER_THREADPOOL_SIZE, cls.ROUTE_WEATHER_MAX_SAMPLES)
+        if cls.UPSTREAM_MAX_WORKERS < needed:
+            print(
+                f"Warning: UPSTREAM_MAX_WORKERS={cls.UPSTREAM_MAX_WORKERS} is below the "
+                f"{needed} needed for SERVER_THREADPOOL_SIZE={cls.SERVER_THREADPOOL_SIZE}; "
+                "upstream calls may queue"
+            )
+        
         return len(missing) == 0
 
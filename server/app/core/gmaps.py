@@ -1,8 +1,61 @@
 """
 Google Maps API wrapper
 """
+import threading
+import time
+from collections import OrderedDict
 import googlemaps
+from typing import Optional
 from app.core.config import Config
+from app.core.models import Directions, GeoLocation
+from app.core.resilience import call_upstream, get_session
+
+PLACE_REFERENCE_PREFIX = "place_id:"
+
+def is_place_reference(location: str) -> bool:
+    """Return whether a location is a ``place_id:<id>`` reference"""
+    return location.startswith(PLACE_REFERENCE_PREFIX)
+
+class PlaceCache:
+    """Bounded LRU cache of resolved place IDs with a TTL"""
+    
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, place_id: str) -> Optional[GeoLocation]:
+        """Return the cached location for a place ID if still fresh"""
+        with self._lock:
+            entry = self._entries.get(place_id)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(place_id)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, place_id: str, location: GeoLocation):
+        """Store a resolved location, evicting the least recently used"""
+        with self._lock:
+            self._entries[place_id] = (time.monotonic(), location)
+            self._entries.move_to_end(place_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def stats(self):
+        """Return hit counters and size of the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "size": len(self._entries)
+            }
 
 class GoogleMapsService:
     """Service for interacting with Google Maps API"""
@@ -10,22 +63,55 @@ class GoogleMapsService:
     def __init__(self):
         if not Config.GOOGLE_MAPS_API_KEY:
             raise ValueError("GOOGLE_MAPS_API_KEY is not set")
-        self.client = googlemaps.Client(key=Config.GOOGLE_MAPS_API_KEY)
+        # The shared session cuts each request, including the client's own
+        # retries, off at the deadline of the upstream attempt running it
+        self.client = googlemaps.Client(
+            key=Config.GOOGLE_MAPS_API_KEY,
+            timeout=Config.UPSTREAM_TIMEOUT_SECONDS,
+            retry_timeout=Config.UPSTREAM_TIMEOUT_SECONDS,
+            requests_session=get_session()
+        )
+        self.places = PlaceCache(
+            ttl_seconds=Config.PLACE_CACHE_TTL_SECONDS,
+            max_entries=Config.PLACE_CACHE_MAX_ENTRIES
+        )
     
-    def get_directions(self, origin, destination, mode="driving"):
+    @staticmethod
+    def _call(method, *args, hedge=True, **kwargs):
+        """
+        Run a client method as a Google Maps upstream call
+        
+        The attempt's timeout reaches the client through the shared session,
+        which bounds every HTTP request made while the attempt runs.
+        
+        Args:
+            method: Bound googlemaps client method
+            hedge: Whether a slow call may be duplicated (idempotent reads)
+        
+        Returns:
+            The method's result
+        """
+        return call_upstream(
+            "google_maps",
+            lambda timeout: method(*args, **kwargs),
+            hedge=hedge
+        )
+    
+    def get_directions(self, origin, destination, mode="driving") -> Optional[Directions]:
         """
         Get directions between two locations
         
         Args:
-            origin: Starting location
-            destination: Ending location
+            origin: Starting location or ``place_id:<id>`` reference
+            destination: Ending location or ``place_id:<id>`` reference
             mode: Travel mode (driving, walking, bicycling, transit)
         
         Returns:
-            dict: Directions data including distance, duration, and route
+            Directions: Distance, duration, addresses and overview polyline
         """
         try:
-            directions = self.client.directions(
+            directions = self._call(
+                self.client.directions,
                 origin=origin,
                 destination=destination,
                 mode=mode
@@ -34,63 +120,97 @@ class GoogleMapsService:
             if not directions:
                 return None
             
-            route = directions[0]
-            leg = route['legs'][0]
-            
-            return {
-                'distance': leg['distance']['text'],
-                'distance_meters': leg['distance']['value'],
-                'duration': leg['duration']['text'],
-                'duration_seconds': leg['duration']['value'],
-                'start_address': leg['start_address'],
-                'end_address': leg['end_address'],
-                'steps': leg['steps'],
-                'polyline': route['overview_polyline']['points']
-            }
+            # Only the summary fields are kept; the per-step list is dropped
+            return Directions.from_route(directions[0])
         except Exception as e:
             print(f"Error getting directions: {e}")
             return None
     
-    def geocode(self, address):
+    def geocode(self, address, session_token=None) -> Optional[GeoLocation]:
         """
         Geocode an address to get coordinates
         
+        ``place_id:<id>`` references are resolved through the place cache
+        instead of the Geocoding API.
+        
         Args:
-            address: Address string
+            address: Address string or ``place_id:<id>`` reference
+            session_token: Optional Places session token for a cache miss
         
         Returns:
-            dict: Geocoding result with lat/lng
+            GeoLocation: Coordinates and formatted address
         """
+        if is_place_reference(address):
+            return self.resolve_place(address[len(PLACE_REFERENCE_PREFIX):], session_token)
+        
         try:
-            geocode_result = self.client.geocode(address)
+            geocode_result = self._call(self.client.geocode, address)
             if geocode_result:
-                location = geocode_result[0]['geometry']['location']
-                return {
-                    'lat': location['lat'],
-                    'lng': location['lng'],
-                    'formatted_address': geocode_result[0]['formatted_address']
-                }
+                return GeoLocation.from_result(geocode_result[0])
             return None
         except Exception as e:
             print(f"Error geocoding address: {e}")
             return None
     
-    def get_place_autocomplete(self, input_text):
+    def resolve_place(self, place_id, session_token=None) -> Optional[GeoLocation]:
+        """
+        Resolve a place ID to coordinates, using the place cache first
+        
+        A Place Details request with the autocomplete session token closes
+        the Places session, so the keystrokes before it are billed as one.
+        
+        Args:
+            place_id: Place ID from an autocomplete suggestion
+            session_token: Optional Places session token
+        
+        Returns:
+            GeoLocation: Coordinates and formatted address
+        """
+        location = self.places.get(place_id)
+        if location is not None:
+            return location
+        
+        try:
+            # Not hedged: a duplicate details request would be billed again
+            details = self._call(
+                self.client.place,
+                place_id,
+                hedge=False,
+                session_token=session_token,
+                fields=["geometry/location", "formatted_address"]
+            )
+            result = details.get('result') if details else None
+            if not result or 'geometry' not in result:
+                return None
+            location = GeoLocation.from_result(result)
+            self.places.put(place_id, location)
+            return location
+        except Exception as e:
+            print(f"Error resolving place {place_id}: {e}")
+            return None
+    
+    def get_place_autocomplete(self, input_text, session_token=None):
         """
         Get place autocomplete suggestions
         
         Args:
             input_text: Partial address or place name
+            session_token: Optional Places session token shared by the
+                keystrokes of one search
         
         Returns:
-            list: List of place suggestions
+            list: List of place suggestions, each with its place_id
         """
         try:
             if not input_text or len(input_text) < 2:
                 return []
             
             # Use places_autocomplete - the method takes input_text as positional arg
-            places = self.client.places_autocomplete(input_text)
+            places = self._call(
+                self.client.places_autocomplete,
+                input_text,
+                session_token=session_token
+            )
             
             # Return the places as-is (they already have 'description' field)
             return places if places else []
@@ -0,0 +1,332 @@
+"""
+Hot-route table with background precomputation
+
+A small set of origin/destination pairs (airport <-> downtown, stations,
+campuses) dominates booking traffic. Pair frequency is tracked with a
+count-min sketch plus a bounded heavy-hitters candidate set, and the top-K
+pairs have their directions, geocodes and fare estimates precomputed on a
+schedule so ``book_ride`` can serve them without upstream calls.
+"""
+import hashlib
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from app.core.config import Config
+from app.core.gmaps import get_gmaps_service, is_place_reference
+from app.core.models import Directions, GeoLocation
+from app.core.uber_api import get_uber_service
+
+RouteKey = Tuple[str, str]
+
+
+def normalize_location(text: str) -> str:
+    """
+    Normalize a free-text location for pair matching
+
+    Args:
+        text: Location as typed or selected by the user
+
+    Returns:
+        str: Lowercased location with collapsed whitespace and separators;
+        place references are returned unchanged since IDs are case-sensitive
+    """
+    if is_place_reference(text):
+        return text
+    text = " ".join(text.lower().split())
+    text = re.sub(r"\s*,\s*", ", ", text)
+    return text.strip(" ,.")
+
+
+class CountMinSketch:
+    """Approximate frequency counter with fixed memory"""
+
+    def __init__(self, width: int, depth: int):
+        if depth > 16:
+            raise ValueError("CountMinSketch depth must be at most 16")
+        self.width = width
+        self.depth = depth
+        self._rows = [[0] * width for _ in range(depth)]
+
+    def _indexes(self, key: str) -> List[int]:
+        """Map a key to one column per row from a single digest"""
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=4 * self.depth).digest()
+        return [
+            int.from_bytes(digest[4 * i:4 * i + 4], "little") % self.width
+            for i in range(self.depth)
+        ]
+
+    def add(self, key: str, count: int = 1) -> int:
+        """
+        Count an occurrence of a key
+
+        Args:
+            key: Item to count
+            count: Number of occurrences to add
+
+        Returns:
+            int: Updated frequency estimate for the key
+        """
+        estimate = None
+        for row, index in zip(self._rows, self._indexes(key)):
+            row[index] += count
+            if estimate is None or row[index] < estimate:
+                estimate = row[index]
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        """Return the frequency estimate for a key (never an undercount)"""
+        return min(row[index] for row, index in zip(self._rows, self._indexes(key)))
+
+    def decay(self):
+        """Halve every counter so estimates favour recent traffic"""
+        for row in self._rows:
+            for i, value in enumerate(row):
+                row[i] = value >> 1
+
+
+class HotRoute:
+    """Precomputed route data for one origin/destination pair"""
+
+    __slots__ = (
+        "origin",
+        "destination",
+        "directions",
+        "start_location",
+        "end_location",
+        "uber_prices",
+        "computed_at",
+    )
+
+    def __init__(
+        self,
+        origin: str,
+        destination: str,
+        directions: Directions,
+        start_location: GeoLocation,
+        end_location: GeoLocation,
+        uber_prices: Optional[List[Dict]]
+    ):
+        self.origin = origin
+        self.destination = destination
+        self.directions = directions
+        self.start_location = start_location
+        self.end_location = end_location
+        self.uber_prices = uber_prices
+        self.computed_at = time.time()
+
+    def age(self) -> float:
+        """Seconds since this route was precomputed"""
+        return time.time() - self.computed_at
+
+
+def precompute_route(origin: str, destination: str) -> Optional[HotRoute]:
+    """
+    Fetch directions, geocodes and fare estimates for a route
+
+    Fares are fetched without the mock fallback, so ``uber_prices`` is None
+    when Uber is unavailable and bookings fetch them live instead.
+
+    Args:
+        origin: Starting location
+        destination: Ending location
+
+    Returns:
+        HotRoute or None if the route or either geocode could not be resolved
+    """
+    gmaps = get_gmaps_service()
+    directions = gmaps.get_directions(origin, destination)
+    if not directions:
+        return None
+
+    start_location = gmaps.geocode(origin)
+    end_location = gmaps.geocode(destination)
+    if not start_location or not end_location:
+        return None
+
+    uber_prices = get_uber_service().fetch_price_estimates(
+        start_location.lat,
+        start_location.lng,
+        end_location.lat,
+        end_location.lng
+    )
+
+    return HotRoute(
+        origin,
+        destination,
+        directions,
+        start_location,
+        end_location,
+        uber_prices
+    )
+
+
+class HotRouteTable:
+    """
+    Tracks origin/destination frequency and serves precomputed routes
+
+    ``record`` and ``lookup`` are called on the booking path and are cheap;
+    ``refresh`` does the upstream work and is meant to run in the background.
+    """
+
+    def __init__(
+        self,
+        top_k: int,
+        min_count: int,
+        max_age_seconds: float,
+        sketch_width: int = 2048,
+        sketch_depth: int = 4
+    ):
+        self.top_k = top_k
+        self.min_count = min_count
+        self.max_age_seconds = max_age_seconds
+        self._sketch = CountMinSketch(sketch_width, sketch_depth)
+        # Heavy-hitter candidates: normalized key -> (estimate, raw origin, raw destination)
+        self._candidates: Dict[RouteKey, Tuple[int, str, str]] = {}
+        self._capacity = max(top_k * 4, 16)
+        self._table: Dict[RouteKey, HotRoute] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.refreshes = 0
+        self.last_refresh_at: Optional[float] = None
+        self.last_refresh_seconds: Optional[float] = None
+
+    @staticmethod
+    def route_key(origin: str, destination: str) -> RouteKey:
+        """Return the normalized key for an origin/destination pair"""
+        return normalize_location(origin), normalize_location(destination)
+
+    def record(self, origin: str, destination: str):
+        """
+        Count one booking for an origin/destination pair
+
+        Args:
+            origin: Starting location
+            destination: Ending location
+        """
+        key = self.route_key(origin, destination)
+        with self._lock:
+            estimate = self._sketch.add("\x1f".join(key))
+            if key in self._candidates or len(self._candidates) < self._capacity:
+                self._candidates[key] = (estimate, origin, destination)
+                return
+            weakest = min(self._candidates, key=lambda k: self._candidates[k][0])
+            if estimate > self._candidates[weakest][0]:
+                del self._candidates[weakest]
+                self._candidates[key] = (estimate, origin, destination)
+
+    def seed(self, origin: str, destination: str):
+        """
+        Mark a pair as hot so the next refresh precomputes it
+
+        Args:
+            origin: Starting location
+            destination: Ending location
+        """
+        for _ in range(self.min_count):
+            self.record(origin, destination)
+
+    def lookup(self, origin: str, destination: str) -> Optional[HotRoute]:
+        """
+        Return the precomputed route for a pair if present and fresh
+
+        Args:
+            origin: Starting location
+            destination: Ending location
+
+        Returns:
+            HotRoute or None on a miss
+        """
+        key = self.route_key(origin, destination)
+        with self._lock:
+            route = self._table.get(key)
+            if route is None:
+                self.misses += 1
+                return None
+            if route.age() > self.max_age_seconds:
+                self.stale += 1
+                self.misses += 1
+                return None
+            self.hits += 1
+            return route
+
+    def top_routes(self) -> List[Tuple[RouteKey, int, str, str]]:
+        """Return the current top-K pairs above ``min_count``"""
+        with self._lock:
+            ranked = sorted(
+                (
+                    (key, self._sketch.estimate("\x1f".join(key)), origin, destination)
+                    for key, (_, origin, destination) in self._candidates.items()
+                ),
+                key=lambda item: item[1],
+                reverse=True
+            )
+        return [item for item in ranked[:self.top_k] if item[1] >= self.min_count]
+
+    def refresh(self):
+        """Precompute the current top-K routes and age the frequency counts"""
+        started = time.monotonic()
+        table: Dict[RouteKey, HotRoute] = {}
+        for key, _, origin, destination in self.top_routes():
+            try:
+                route = precompute_route(origin, destination)
+            except Exception as e:
+                print(f"Error precomputing hot route {origin} -> {destination}: {e}")
+                route = None
+            if route is not None:
+                table[key] = route
+
+        with self._lock:
+            self._table = table
+            self._sketch.decay()
+            self._candidates = {
+                key: (estimate >> 1, origin, destination)
+                for key, (estimate, origin, destination) in self._candidates.items()
+            }
+            self.refreshes += 1
+            self.last_refresh_at = time.time()
+            self.last_refresh_seconds = time.monotonic() - started
+
+    def stats(self) -> Dict:
+        """Return hit and freshness metrics for the table"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            ages = [route.age() for route in self._table.values()]
+            routes = [
+                {
+                    "origin": route.origin,
+                    "destination": route.destination,
+                    "age_seconds": round(route.age(), 1)
+                }
+                for route in self._table.values()
+            ]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "tracked_pairs": len(self._candidates),
+                "table_size": len(self._table),
+                "refreshes": self.refreshes,
+                "last_refresh_at": self.last_refresh_at,
+                "last_refresh_seconds": self.last_refresh_seconds,
+                "oldest_route_seconds": round(max(ages), 1) if ages else None,
+                "routes": routes
+            }
+
+
+# Singleton instance
+_hot_route_table = None
+
+def get_hot_route_table():
+    """Get or create the hot-route table instance"""
+    global _hot_route_table
+    if _hot_route_table is None:
+        _hot_route_table = HotRouteTable(
+            top_k=Config.HOT_ROUTES_TOP_K,
+            min_count=Config.HOT_ROUTES_MIN_COUNT,
+            max_age_seconds=Config.HOT_ROUTES_MAX_AGE_SECONDS
+        )
+    return _hot_route_table
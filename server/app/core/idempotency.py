@@ -0,0 +1,190 @@
+"""
+Request deduplication and result replay for idempotent endpoints
+"""
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from app.core.config import Config
+from app.core.gmaps import is_place_reference
+
+
+class IdempotencyKeyReuseError(Exception):
+    """Raised when an idempotency key is reused with a different payload"""
+
+
+def derive_idempotency_key(
+    source: str,
+    destination: str,
+    product_id: Optional[str] = None,
+    bucket_seconds: Optional[int] = None
+) -> str:
+    """
+    Derive an idempotency key for a booking that did not send one
+
+    Retries of the same trip within one time bucket map to the same key.
+
+    Args:
+        source: Starting location
+        destination: Ending location
+        product_id: Optional Uber product ID
+        bucket_seconds: Width of the time bucket in seconds
+
+    Returns:
+        str: Derived idempotency key
+    """
+    if bucket_seconds is None:
+        bucket_seconds = Config.IDEMPOTENCY_BUCKET_SECONDS
+    bucket = int(time.time() // max(bucket_seconds, 1))
+    return "derived:" + request_fingerprint(source, destination, product_id, bucket)
+
+
+def request_fingerprint(*parts: Any) -> str:
+    """
+    Hash request fields into a stable fingerprint
+
+    Args:
+        parts: Request fields; strings are whitespace- and case-normalized,
+            except case-sensitive ``place_id:<id>`` references
+
+    Returns:
+        str: Hex digest of the normalized fields
+    """
+    normalized = []
+    for part in parts:
+        if isinstance(part, str) and not is_place_reference(part):
+            part = " ".join(part.lower().split())
+        normalized.append("" if part is None else str(part))
+    return hashlib.sha256("\x1f".join(normalized).encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Deduplicates concurrent requests and replays recent results
+
+    Concurrent calls with the same key attach to the single in-flight
+    computation. Successful results are kept in a bounded LRU store for
+    ``ttl_seconds``; failures are never stored, so a retry after an error
+    runs again.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._completed: "OrderedDict[str, Tuple[float, str, Any]]" = OrderedDict()
+        self._in_flight: Dict[str, Tuple[str, asyncio.Task]] = {}
+        self.executed = 0
+        self.replayed = 0
+        self.joined = 0
+
+    async def run(
+        self,
+        key: str,
+        fingerprint: str,
+        compute: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """
+        Run ``compute`` once per key, sharing or replaying its result
+
+        Args:
+            key: Idempotency key
+            fingerprint: Fingerprint of the request payload
+            compute: Coroutine function producing the result
+
+        Returns:
+            tuple: (result, replayed) where replayed is True when the result
+            came from a previous or concurrent identical request
+        """
+        entry = self._get_completed(key)
+        if entry is not None:
+            stored_fingerprint, result = entry
+            self._check_fingerprint(key, fingerprint, stored_fingerprint)
+            self.replayed += 1
+            return result, True
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            stored_fingerprint, task = in_flight
+            self._check_fingerprint(key, fingerprint, stored_fingerprint)
+            self.joined += 1
+            # Shield so a disconnecting client does not cancel the shared work
+            return await asyncio.shield(task), True
+
+        task = asyncio.ensure_future(compute())
+        self._in_flight[key] = (fingerprint, task)
+        task.add_done_callback(lambda t: self._on_done(key, fingerprint, t))
+        self.executed += 1
+        return await asyncio.shield(task), False
+
+    async def drain(self, timeout: float) -> int:
+        """
+        Wait for in-flight computations to finish
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            int: Number of computations still running at the timeout
+        """
+        tasks = [task for _, task in self._in_flight.values()]
+        if not tasks:
+            return 0
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        return len(pending)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters describing store efficiency"""
+        return {
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "joined": self.joined,
+            "in_flight": len(self._in_flight),
+            "stored": len(self._completed)
+        }
+
+    def _get_completed(self, key: str) -> Optional[Tuple[str, Any]]:
+        """Return a live stored entry, evicting it if expired"""
+        entry = self._completed.get(key)
+        if entry is None:
+            return None
+        stored_at, fingerprint, result = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._completed[key]
+            return None
+        self._completed.move_to_end(key)
+        return fingerprint, result
+
+    def _on_done(self, key: str, fingerprint: str, task: asyncio.Task):
+        """Move a finished computation from in-flight to the result store"""
+        self._in_flight.pop(key, None)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            return
+        self._completed[key] = (time.monotonic(), fingerprint, task.result())
+        self._completed.move_to_end(key)
+        while len(self._completed) > self.max_entries:
+            self._completed.popitem(last=False)
+
+    @staticmethod
+    def _check_fingerprint(key: str, fingerprint: str, stored_fingerprint: str):
+        """Reject reuse of a key for a different payload"""
+        if fingerprint != stored_fingerprint:
+            raise IdempotencyKeyReuseError(
+                f"Idempotency key {key!r} was already used with a different request"
+            )
+
+
+# Singleton instance
+_idempotency_store = None
+
+def get_idempotency_store():
+    """Get or create the idempotency store instance"""
+    global _idempotency_store
+    if _idempotency_store is None:
+        _idempotency_store = IdempotencyStore(
+            ttl_seconds=Config.IDEMPOTENCY_TTL_SECONDS,
+            max_entries=Config.IDEMPOTENCY_MAX_ENTRIES
+        )
+    return _idempotency_store
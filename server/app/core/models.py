@@ -0,0 +1,75 @@
+"""
+Compact internal result types for upstream data
+
+Upstream responses are large nested dicts (a directions leg carries every
+step). These slotted types keep only the fields the API returns, so results
+cached in the hot-route table and idempotency store stay small.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict
+
+
+@dataclass(frozen=True)
+class Directions:
+    """Summary of the first leg of a directions result"""
+
+    __slots__ = (
+        "distance",
+        "distance_meters",
+        "duration",
+        "duration_seconds",
+        "start_address",
+        "end_address",
+        "polyline",
+    )
+
+    distance: str
+    distance_meters: int
+    duration: str
+    duration_seconds: int
+    start_address: str
+    end_address: str
+    polyline: str
+
+    @classmethod
+    def from_route(cls, route: Dict[str, Any]) -> "Directions":
+        """Build from one route of a Google Directions response"""
+        leg = route['legs'][0]
+        return cls(
+            leg['distance']['text'],
+            leg['distance']['value'],
+            leg['duration']['text'],
+            leg['duration']['value'],
+            leg['start_address'],
+            leg['end_address'],
+            route['overview_polyline']['points']
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the ride_details payload for API responses"""
+        return {
+            "distance": self.distance,
+            "distance_meters": self.distance_meters,
+            "duration": self.duration,
+            "duration_seconds": self.duration_seconds,
+            "start_address": self.start_address,
+            "end_address": self.end_address,
+            "polyline": self.polyline
+        }
+
+
+@dataclass(frozen=True)
+class GeoLocation:
+    """A resolved coordinate with its formatted address"""
+
+    __slots__ = ("lat", "lng", "formatted_address")
+
+    lat: float
+    lng: float
+    formatted_address: str
+
+    @classmethod
+    def from_result(cls, result: Dict[str, Any]) -> "GeoLocation":
+        """Build from a Google geocode or place details result"""
+        location = result['geometry']['location']
+        return cls(location['lat'], location['lng'], result['formatted_address'])
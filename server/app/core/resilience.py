@@ -0,0 +1,452 @@
+"""
+Resilience layer for upstream calls
+
+Every upstream call goes through ``call_upstream``, which
+
+- bounds the call by the remaining per-request latency budget (a deadline
+  carried in a context variable and started by ``request_deadline``),
+- fails fast while the upstream's circuit breaker is open, and
+- optionally hedges idempotent calls by issuing a duplicate once the first
+  attempt is slower than the upstream's recent p95 latency.
+
+An attempt's clock starts when a pool thread picks it up, so time spent
+queued locally is never blamed on the upstream. Only attempts that ran with
+their full timeout or failed outright count towards opening the breaker;
+calls cut short by the request budget do not.
+
+Callers keep their existing ``except`` blocks: any failure surfaces as an
+exception, so they fall back to their mock or default values as before.
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+import requests
+from requests.adapters import HTTPAdapter
+from app.core.config import Config
+
+T = TypeVar("T")
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "request_deadline", default=None
+)
+
+# Deadline of the upstream attempt running in the current context
+_attempt_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "attempt_deadline", default=None
+)
+
+_executor = ThreadPoolExecutor(
+    max_workers=Config.UPSTREAM_MAX_WORKERS,
+    thread_name_prefix="upstream"
+)
+
+
+class _AttemptSession(requests.Session):
+    """
+    Session that bounds every request by the running attempt's deadline
+
+    Client libraries sharing this session (e.g. googlemaps, which applies its
+    own timeout and retries) are cut off when the attempt's time is up.
+    """
+
+    def request(self, method, url, **kwargs):
+        """Send a request, capping its timeout at the attempt's remaining time"""
+        deadline = _attempt_deadline.get()
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise requests.exceptions.Timeout("Upstream attempt deadline passed")
+            timeout = kwargs.get("timeout")
+            if isinstance(timeout, tuple):
+                kwargs["timeout"] = tuple(
+                    remaining if t is None else min(t, remaining) for t in timeout
+                )
+            else:
+                kwargs["timeout"] = remaining if timeout is None else min(timeout, remaining)
+        return super().request(method, url, **kwargs)
+
+
+_session = _AttemptSession()
+_adapter = HTTPAdapter(
+    pool_connections=Config.UPSTREAM_MAX_WORKERS,
+    pool_maxsize=Config.UPSTREAM_MAX_WORKERS
+)
+_session.mount("http://", _adapter)
+_session.mount("https://", _adapter)
+
+
+class UpstreamError(Exception):
+    """Raised when an upstream call fails or returns a server error"""
+
+
+class CircuitOpenError(UpstreamError):
+    """Raised without calling the upstream while its circuit is open"""
+
+
+class DeadlineExceeded(UpstreamError):
+    """Raised when the request's latency budget is used up"""
+
+
+@contextmanager
+def request_deadline(budget_seconds: float):
+    """
+    Start a latency budget for the calls made inside the block
+
+    Nested blocks can only shorten the deadline, never extend it.
+
+    Args:
+        budget_seconds: Total time allowed for the block
+    """
+    deadline = time.monotonic() + budget_seconds
+    current = _deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_budget(cap: Optional[float] = None) -> float:
+    """
+    Return the seconds left in the current request's budget
+
+    Args:
+        cap: Upper bound on the returned value, e.g. a per-call timeout
+
+    Returns:
+        float: Seconds left, capped at ``cap``
+
+    Raises:
+        DeadlineExceeded: If the budget is already used up
+    """
+    if cap is None:
+        cap = Config.UPSTREAM_TIMEOUT_SECONDS
+    deadline = _deadline.get()
+    if deadline is None:
+        return cap
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded("Request latency budget exhausted")
+    return min(remaining, cap)
+
+
+class CircuitBreaker:
+    """
+    Per-upstream circuit breaker
+
+    Opens after ``failure_threshold`` consecutive failures and rejects calls
+    for ``reset_seconds``. Then a single trial call is let through
+    (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return whether a call may go to the upstream now"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = "half_open"
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        """Close the circuit after a successful call"""
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        """Count a failure, opening the circuit at the threshold"""
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    print(f"Warning: circuit for {self.name} opened after {self.failures} failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """End a call that gave no verdict, letting the next call be the trial"""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+
+
+class LatencyTracker:
+    """Sliding window of recent successful call latencies"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        """Record one call latency"""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction: float, min_samples: int = 0) -> Optional[float]:
+        """Return the latency at ``fraction``, or None with too few samples"""
+        with self._lock:
+            if not self._samples or len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+class _Upstream:
+    """Breaker, latency window and counters for one upstream"""
+
+    def __init__(self, name: str):
+        self.breaker = CircuitBreaker(
+            name,
+            failure_threshold=Config.CIRCUIT_FAILURE_THRESHOLD,
+            reset_seconds=Config.CIRCUIT_RESET_SECONDS
+        )
+        self.latency = LatencyTracker()
+        self.calls = 0
+        self.failures = 0
+        self.abandoned = 0
+        self.hedged = 0
+
+
+_upstreams: Dict[str, _Upstream] = {}
+_upstreams_lock = threading.Lock()
+
+
+def _get_upstream(name: str) -> _Upstream:
+    """Get or create the state for an upstream"""
+    with _upstreams_lock:
+        upstream = _upstreams.get(name)
+        if upstream is None:
+            upstream = _upstreams[name] = _Upstream(name)
+        return upstream
+
+
+class _Attempt:
+    """One run of an upstream call on the pool"""
+
+    def __init__(self, fn: Callable[[float], T], cap: float, not_after: Optional[float] = None):
+        self.fn = fn
+        self.cap = cap
+        self.not_after = not_after
+        self.timeout = 0.0
+        self.started_at = 0.0
+        self.finished_at: Optional[float] = None
+        # Resolves to True when a pool thread starts the attempt, or False
+        # when the request budget ran out while it was queued
+        self.started: Future = Future()
+
+    @property
+    def ends_at(self) -> float:
+        """Time at which the attempt's timeout expires"""
+        return self.started_at + self.timeout
+
+    def run(self) -> T:
+        """Run on a pool thread; the timeout is taken from this moment"""
+        try:
+            timeout = remaining_budget(self.cap)
+        except DeadlineExceeded:
+            self.started.set_result(False)
+            raise
+        self.started_at = time.monotonic()
+        if self.not_after is not None:
+            timeout = min(timeout, max(self.not_after - self.started_at, 0))
+        self.timeout = timeout
+        self.started.set_result(True)
+        _attempt_deadline.set(self.ends_at)
+        try:
+            return self.fn(timeout)
+        finally:
+            self.finished_at = time.monotonic()
+
+    def counts_as_failure(self) -> bool:
+        """
+        Whether a failed or unfinished attempt is the upstream's fault
+
+        An attempt whose timeout was cut short by the request budget only
+        counts when it failed before that timeout expired.
+        """
+        if not self.started.done() or not self.started.result():
+            return False
+        if self.timeout >= self.cap:
+            return True
+        return self.finished_at is not None and self.finished_at < self.ends_at
+
+
+def _submit(attempt: _Attempt):
+    """Queue an attempt on the upstream pool with the caller's context"""
+    return _executor.submit(contextvars.copy_context().run, attempt.run)
+
+
+def call_upstream(
+    name: str,
+    fn: Callable[[float], T],
+    hedge: bool = False,
+    timeout: Optional[float] = None
+) -> T:
+    """
+    Call an upstream within the request budget and its circuit breaker
+
+    Args:
+        name: Upstream name, used to pick the breaker and latency window
+        fn: Performs the call; receives the timeout in seconds to apply
+        hedge: Whether duplicate attempts are allowed (idempotent calls only)
+        timeout: Per-call timeout cap, defaults to UPSTREAM_TIMEOUT_SECONDS
+
+    Returns:
+        The value returned by ``fn``
+
+    Raises:
+        CircuitOpenError: If the upstream's circuit is open
+        DeadlineExceeded: If the budget runs out before a result arrives
+        Exception: Whatever ``fn`` raised when every attempt failed
+    """
+    upstream = _get_upstream(name)
+    cap = Config.UPSTREAM_TIMEOUT_SECONDS if timeout is None else timeout
+    queue_timeout = remaining_budget(cap)
+    if not upstream.breaker.allow():
+        raise CircuitOpenError(f"Circuit for {name} is open")
+
+    upstream.calls += 1
+    primary = _Attempt(fn, cap)
+    attempts = {_submit(primary): primary}
+    error: Optional[BaseException] = None
+    try:
+        # Waiting for a free pool thread is local congestion, not upstream latency
+        wait([primary.started], timeout=queue_timeout)
+        if primary.started.done() and primary.started.result():
+            if hedge:
+                hedge_delay = upstream.latency.percentile(0.95, Config.HEDGE_MIN_SAMPLES)
+                if hedge_delay is not None and hedge_delay < primary.timeout:
+                    done, _ = wait(
+                        attempts,
+                        timeout=max(primary.started_at + hedge_delay - time.monotonic(), 0)
+                    )
+                    if not done:
+                        upstream.hedged += 1
+                        duplicate = _Attempt(fn, cap, not_after=primary.ends_at)
+                        attempts[_submit(duplicate)] = duplicate
+
+            pending = set(attempts)
+            while pending:
+                done, pending = wait(
+                    pending,
+                    timeout=max(primary.ends_at - time.monotonic(), 0),
+                    return_when=FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                for future in done:
+                    if future.exception() is None:
+                        attempt = attempts[future]
+                        upstream.latency.add(time.monotonic() - attempt.started_at)
+                        upstream.breaker.record_success()
+                        return future.result()
+                    error = future.exception()
+    finally:
+        for future in attempts:
+            future.cancel()
+
+    if any(attempt.counts_as_failure() for attempt in attempts.values()):
+        upstream.failures += 1
+        upstream.breaker.record_failure()
+    else:
+        upstream.abandoned += 1
+        upstream.breaker.release()
+    if error is None:
+        error = DeadlineExceeded(f"{name} did not respond within the request budget")
+    raise error
+
+
+def http_get(
+    name: str,
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    hedge: bool = True
+) -> requests.Response:
+    """
+    Issue a resilient GET request through the shared session
+
+    Server errors (5xx) count as upstream failures; other responses are
+    returned for the caller to inspect.
+
+    Args:
+        name: Upstream name
+        url: Request URL
+        params: Query parameters
+        headers: Request headers
+        hedge: Whether a slow request may be duplicated
+
+    Returns:
+        requests.Response
+    """
+    def fetch(timeout: float) -> requests.Response:
+        response = _session.get(url, params=params, headers=headers, timeout=timeout)
+        if response.status_code >= 500:
+            raise UpstreamError(f"{name} returned HTTP {response.status_code}")
+        return response
+
+    return call_upstream(name, fetch, hedge=hedge)
+
+
+def warm_connections(urls: List[str]):
+    """
+    Open pooled connections to upstream hosts before the first requests
+
+    A HEAD request completes the TCP and TLS handshakes; its response and
+    any failure are ignored, and no breaker or latency state is touched.
+
+    Args:
+        urls: One URL per upstream host
+    """
+    def touch(url: str):
+        try:
+            _session.head(url, timeout=Config.UPSTREAM_TIMEOUT_SECONDS)
+        except requests.exceptions.RequestException as e:
+            print(f"Warning: could not warm connection to {url}: {e}")
+
+    list(_executor.map(touch, urls))
+
+
+def get_session() -> requests.Session:
+    """Return the pooled HTTP session shared by upstream clients"""
+    return _session
+
+
+def upstream_stats() -> Dict[str, Dict[str, Any]]:
+    """Return breaker state, latency and counters per upstream"""
+    with _upstreams_lock:
+        upstreams = dict(_upstreams)
+    stats = {}
+    for name, upstream in upstreams.items():
+        p50 = upstream.latency.percentile(0.5)
+        p95 = upstream.latency.percentile(0.95)
+        stats[name] = {
+            "circuit": upstream.breaker.state,
+            "calls": upstream.calls,
+            "failures": upstream.failures,
+            "abandoned": upstream.abandoned,
+            "hedged": upstream.hedged,
+            "rejected": upstream.breaker.rejected,
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None
+        }
+    return stats
@@ -1,9 +1,10 @@
 """
 Uber API integration
 """
-import requests
+import json
 from typing import Optional, Dict, List
 from app.core.config import Config
+from app.core.resilience import http_get
 
 class UberAPIService:
     """Service for interacting with Uber API"""
@@ -25,38 +26,122 @@ class UberAPIService:
             headers["Authorization"] = f"Token {self.server_token}"
         return headers
     
-    def get_products(self, latitude: float, longitude: float) -> Optional[List[Dict]]:
+    def _fetch(self, path: str, params: Dict) -> Optional[bytes]:
         """
-        Get available Uber products at a location
+        Fetch an Uber endpoint and return the response body unparsed
         
         Args:
-            latitude: Latitude coordinate
-            longitude: Longitude coordinate
+            path: Endpoint path below the API base URL
+            params: Query parameters
         
         Returns:
-            List of available products or None if error
+            Raw JSON body, or None if the API is not configured or failed
         """
         if not self.server_token:
             print("Warning: UBER_SERVER_TOKEN not set. Returning mock data.")
-            return self._get_mock_products()
+            return None
         
         try:
-            url = f"{self.base_url}/products"
-            params = {
-                "latitude": latitude,
-                "longitude": longitude
-            }
-            
-            response = requests.get(url, headers=self._get_headers(), params=params)
+            url = f"{self.base_url}{path}"
+            response = http_get("uber", url, params=params, headers=self._get_headers())
             
             if response.status_code == 200:
-                return response.json().get("products", [])
+                return response.content
             else:
                 print(f"Uber API error: {response.status_code} - {response.text}")
-                return self._get_mock_products()
+                return None
         except Exception as e:
-            print(f"Error fetching Uber products: {e}")
-            return self._get_mock_products()
+            print(f"Error fetching Uber {path}: {e}")
+            return None
+    
+    @staticmethod
+    def _parse(raw: Optional[bytes], key: str) -> Optional[List[Dict]]:
+        """Parse the list under ``key`` from a raw body, None if unusable"""
+        if raw is None:
+            return None
+        try:
+            body = json.loads(raw)
+        except ValueError as e:
+            print(f"Error parsing Uber response: {e}")
+            return None
+        if not isinstance(body, dict):
+            print(f"Unexpected Uber response body: {type(body).__name__}")
+            return None
+        return body.get(key, [])
+    
+    @staticmethod
+    def _encode(key: str, items: List[Dict]) -> bytes:
+        """Encode mock data in the shape of the upstream body"""
+        return json.dumps({key: items}).encode("utf-8")
+    
+    def _products_params(self, latitude: float, longitude: float) -> Dict:
+        """Query parameters for the products endpoint"""
+        return {
+            "latitude": latitude,
+            "longitude": longitude
+        }
+    
+    def _price_params(
+        self,
+        start_latitude: float,
+        start_longitude: float,
+        end_latitude: float,
+        end_longitude: float
+    ) -> Dict:
+        """Query parameters for the price estimates endpoint"""
+        return {
+            "start_latitude": start_latitude,
+            "start_longitude": start_longitude,
+            "end_latitude": end_latitude,
+            "end_longitude": end_longitude
+        }
+    
+    def _time_params(
+        self,
+        latitude: float,
+        longitude: float,
+        product_id: Optional[str] = None
+    ) -> Dict:
+        """Query parameters for the time estimates endpoint"""
+        params = {
+            "start_latitude": latitude,
+            "start_longitude": longitude
+        }
+        if product_id:
+            params["product_id"] = product_id
+        return params
+    
+    def get_products(self, latitude: float, longitude: float) -> Optional[List[Dict]]:
+        """
+        Get available Uber products at a location
+        
+        Args:
+            latitude: Latitude coordinate
+            longitude: Longitude coordinate
+        
+        Returns:
+            List of available products or None if error
+        """
+        raw = self._fetch("/products", self._products_params(latitude, longitude))
+        products = self._parse(raw, "products")
+        return products if products is not None else self._get_mock_products()
+    
+    def get_products_raw(self, latitude: float, longitude: float) -> bytes:
+        """
+        Get available Uber products as the upstream JSON body
+        
+        The body is passed through without decoding; mock data is encoded
+        in the same ``{"products": [...]}`` shape.
+        
+        Args:
+            latitude: Latitude coordinate
+            longitude: Longitude coordinate
+        
+        Returns:
+            bytes: JSON body
+        """
+        raw = self._fetch("/products", self._products_params(latitude, longitude))
+        return raw if raw is not None else self._encode("products", self._get_mock_products())
     
     def get_price_estimates(
         self, 
@@ -77,29 +162,53 @@ class UberAPIService:
         Returns:
             List of price estimates or None if error
         """
-        if not self.server_token:
-            print("Warning: UBER_SERVER_TOKEN not set. Returning mock data.")
-            return self._get_mock_price_estimates()
+        prices = self.fetch_price_estimates(start_latitude, start_longitude, end_latitude, end_longitude)
+        return prices if prices is not None else self._get_mock_price_estimates()
+    
+    def fetch_price_estimates(
+        self,
+        start_latitude: float,
+        start_longitude: float,
+        end_latitude: float,
+        end_longitude: float
+    ) -> Optional[List[Dict]]:
+        """
+        Get live price estimates without the mock fallback
         
-        try:
-            url = f"{self.base_url}/estimates/price"
-            params = {
-                "start_latitude": start_latitude,
-                "start_longitude": start_longitude,
-                "end_latitude": end_latitude,
-                "end_longitude": end_longitude
-            }
-            
-            response = requests.get(url, headers=self._get_headers(), params=params)
-            
-            if response.status_code == 200:
-                return response.json().get("prices", [])
-            else:
-                print(f"Uber API error: {response.status_code} - {response.text}")
-                return self._get_mock_price_estimates()
-        except Exception as e:
-            print(f"Error fetching price estimates: {e}")
-            return self._get_mock_price_estimates()
+        Args:
+            start_latitude: Starting latitude
+            start_longitude: Starting longitude
+            end_latitude: Ending latitude
+            end_longitude: Ending longitude
+        
+        Returns:
+            List of price estimates, or None if Uber is unavailable
+        """
+        params = self._price_params(start_latitude, start_longitude, end_latitude, end_longitude)
+        return self._parse(self._fetch("/estimates/price", params), "prices")
+    
+    def get_price_estimates_raw(
+        self,
+        start_latitude: float,
+        start_longitude: float,
+        end_latitude: float,
+        end_longitude: float
+    ) -> bytes:
+        """
+        Get price estimates as the upstream JSON body
+        
+        Args:
+            start_latitude: Starting latitude
+            start_longitude: Starting longitude
+            end_latitude: Ending latitude
+            end_longitude: Ending longitude
+        
+        Returns:
+            bytes: JSON body of the form ``{"prices": [...]}``
+        """
+        params = self._price_params(start_latitude, start_longitude, end_latitude, end_longitude)
+        raw = self._fetch("/estimates/price", params)
+        return raw if raw is not None else self._encode("prices", self._get_mock_price_estimates())
     
     def get_time_estimates(
         self,
@@ -118,29 +227,29 @@ class UberAPIService:
         Returns:
             List of time estimates or None if error
         """
-        if not self.server_token:
-            print("Warning: UBER_SERVER_TOKEN not set. Returning mock data.")
-            return self._get_mock_time_estimates()
+        params = self._time_params(latitude, longitude, product_id)
+        times = self._parse(self._fetch("/estimates/time", params), "times")
+        return times if times is not None else self._get_mock_time_estimates()
+    
+    def get_time_estimates_raw(
+        self,
+        latitude: float,
+        longitude: float,
+        product_id: Optional[str] = None
+    ) -> bytes:
+        """
+        Get time estimates as the upstream JSON body
         
-        try:
-            url = f"{self.base_url}/estimates/time"
-            params = {
-                "start_latitude": latitude,
-                "start_longitude": longitude
-            }
-            if product_id:
-                params["product_id"] = product_id
-            
-            response = requests.get(url, headers=self._get_headers(), params=params)
-            
-            if response.status_code == 200:
-                return response.json().get("times", [])
-            else:
-                print(f"Uber API error: {response.status_code} - {response.text}")
-                return self._get_mock_time_estimates()
-        except Exception as e:
-            print(f"Error fetching time estimates: {e}")
-            return self._get_mock_time_estimates()
+        Args:
+            latitude: Latitude coordinate
+            longitude: Longitude coordinate
+            product_id: Optional product ID to filter
+        
+        Returns:
+            bytes: JSON body of the form ``{"times": [...]}``
+        """
+        raw = self._fetch("/estimates/time", self._time_params(latitude, longitude, product_id))
+        return raw if raw is not None else self._encode("times", self._get_mock_time_estimates())
     
     def _get_mock_products(self) -> List[Dict]:
         """Return mock products when API is not configured"""
@@ -0,0 +1,573 @@
+"""
+Load generator that replays realistic client sessions
+
+Each simulated session follows the mobile client in client/app/(tabs)/index.tsx:
+the rider types the pickup address one keystroke at a time, the client calls
+/api/autocomplete after a 300 ms debounce once more than two characters are
+entered, and selecting a suggestion calls /api/place-details. The same
+happens for the destination, and the session ends with POST /api/book-ride
+using the selected place IDs.
+
+By default the generator starts a local instance of the app with stubbed
+upstreams (Google Maps, Uber, OpenWeather and Gemini), so runs are free and
+repeatable and every upstream call can be counted. Pass --url to target a
+running server instead.
+
+Usage:
+    python -m app.loadgen --sessions 200 --arrival-rate 5
+    python -m app.loadgen --url http://localhost:8000/api --sessions 50
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import socket
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import requests
+
+DEFAULT_ADDRESSES = [
+    "San Francisco International Airport",
+    "Union Square, San Francisco, CA",
+    "Ferry Building, San Francisco, CA",
+    "Caltrain Station, 4th and King, San Francisco, CA",
+    "Stanford University, Stanford, CA",
+    "UC Berkeley, Berkeley, CA",
+    "Oakland International Airport",
+    "Golden Gate Park, San Francisco, CA",
+    "Fisherman's Wharf, San Francisco, CA",
+    "Mission Dolores Park, San Francisco, CA",
+    "Salesforce Tower, San Francisco, CA",
+    "Palo Alto Caltrain Station, Palo Alto, CA",
+    "San Jose International Airport",
+    "Chase Center, San Francisco, CA",
+    "Oracle Park, San Francisco, CA",
+    "Twin Peaks, San Francisco, CA",
+    "Berkeley BART Station, Berkeley, CA",
+    "Mountain View Caltrain Station, Mountain View, CA",
+    "Embarcadero Center, San Francisco, CA",
+    "Lake Merritt, Oakland, CA",
+]
+
+# Client behaviour from client/app/(tabs)/index.tsx
+CLIENT_DEBOUNCE_SECONDS = 0.3
+CLIENT_MIN_CHARS = 3
+
+
+class UpstreamCounter:
+    """Thread-safe count of stubbed upstream calls"""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, upstream: str):
+        """Count one call to an upstream"""
+        with self._lock:
+            self._counts[upstream] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        """Return the calls counted so far per upstream"""
+        with self._lock:
+            return dict(self._counts)
+
+
+class AddressPicker:
+    """Draws addresses from a Zipf-like popularity distribution"""
+
+    def __init__(self, addresses: List[str], exponent: float, rng: random.Random):
+        self.addresses = addresses
+        self.weights = [1.0 / (rank ** exponent) for rank in range(1, len(addresses) + 1)]
+        self.rng = rng
+        self._lock = threading.Lock()
+
+    def pick_pair(self):
+        """Return a distinct (source, destination) pair"""
+        with self._lock:
+            source = self.rng.choices(self.addresses, self.weights)[0]
+            destination = source
+            while destination == source:
+                destination = self.rng.choices(self.addresses, self.weights)[0]
+            return source, destination
+
+
+def _fake_location(address: str) -> Dict[str, float]:
+    """Deterministic coordinate around the Bay Area for an address"""
+    digest = hashlib.sha256(address.lower().encode("utf-8")).digest()
+    return {
+        "lat": 37.3 + digest[0] / 255 * 0.6,
+        "lng": -122.5 + digest[1] / 255 * 0.5,
+    }
+
+
+def install_stubs(counter: UpstreamCounter, latency_seconds: float, addresses: List[str]):
+    """
+    Replace every upstream with an in-process stub
+
+    Google Maps is stubbed at the googlemaps client, Uber and OpenWeather at
+    the resilience layer's HTTP session, and Gemini at the chat model class,
+    so the server's own caching, hedging and fallback code still runs.
+
+    Args:
+        counter: Receives one count per upstream call
+        latency_seconds: Simulated latency of every upstream call
+        addresses: Addresses the autocomplete and place details stubs know
+    """
+    from googlemaps.convert import encode_polyline
+    from langchain_core.messages import AIMessage
+    from langchain_core.runnables import RunnableLambda
+    from requests.adapters import BaseAdapter
+    import app.agents.travel_agent as travel_agent
+    import app.core.gmaps as gmaps_module
+    from app.core import resilience
+    from app.core.config import Config
+    from app.core.uber_api import UberAPIService
+
+    places = {hashlib.md5(address.encode()).hexdigest(): address for address in addresses}
+
+    def delay():
+        """Sleep for the simulated upstream latency"""
+        if latency_seconds > 0:
+            time.sleep(latency_seconds * random.uniform(0.5, 1.5))
+
+    class StubMapsClient:
+        """Implements the googlemaps.Client methods the server uses"""
+
+        base_url = "https://maps.googleapis.com"
+
+        def directions(self, origin, destination, mode="driving"):
+            """Return a straight-line route between the two fake locations"""
+            counter.add("google_directions")
+            delay()
+            start, end = _fake_location(origin), _fake_location(destination)
+            points = [
+                (start["lat"] + (end["lat"] - start["lat"]) * i / 20,
+                 start["lng"] + (end["lng"] - start["lng"]) * i / 20)
+                for i in range(21)
+            ]
+            meters = int(111_000 * math.hypot(end["lat"] - start["lat"], end["lng"] - start["lng"]))
+            seconds = max(meters // 10, 60)
+            return [{
+                "legs": [{
+                    "distance": {"text": f"{meters / 1000:.1f} km", "value": meters},
+                    "duration": {"text": f"{seconds // 60} mins", "value": seconds},
+                    "start_address": origin,
+                    "end_address": destination,
+                    "steps": [{"html_instructions": "Drive"} for _ in range(40)],
+                }],
+                "overview_polyline": {"points": encode_polyline(points)},
+            }]
+
+        def geocode(self, address):
+            """Return the fake location of an address"""
+            counter.add("google_geocode")
+            delay()
+            return [{"geometry": {"location": _fake_location(address)}, "formatted_address": address}]
+
+        def places_autocomplete(self, input_text, **kwargs):
+            """Return known addresses containing the typed text"""
+            counter.add("google_autocomplete")
+            delay()
+            needle = input_text.lower()
+            return [
+                {"description": address, "place_id": place_id}
+                for place_id, address in places.items()
+                if needle in address.lower()
+            ][:5]
+
+        def place(self, place_id, session_token=None, fields=None):
+            """Return the fake location of a known place ID"""
+            counter.add("google_place_details")
+            delay()
+            address = places.get(place_id)
+            if address is None:
+                return {"result": {}}
+            return {"result": {
+                "geometry": {"location": _fake_location(address)},
+                "formatted_address": address,
+            }}
+
+    uber_mocks = UberAPIService()
+
+    class StubHTTPAdapter(BaseAdapter):
+        """Answers Uber and OpenWeather requests with canned JSON"""
+
+        def send(self, request, **kwargs):
+            """Return a canned response for the request's upstream"""
+            if request.method == "HEAD":
+                # Connection warm-up at startup, not an upstream call
+                body = {}
+            elif "openweathermap" in request.url:
+                counter.add("openweather")
+                body = {"weather": [{"description": "light rain"}], "main": {"temp": 14.0}}
+            elif "/estimates/price" in request.url:
+                counter.add("uber_prices")
+                body = {"prices": uber_mocks._get_mock_price_estimates()}
+            elif "/estimates/time" in request.url:
+                counter.add("uber_times")
+                body = {"times": uber_mocks._get_mock_time_estimates()}
+            else:
+                counter.add("uber_products")
+                body = {"products": uber_mocks._get_mock_products()}
+            delay()
+            response = requests.Response()
+            response.status_code = 200
+            response._content = json.dumps(body).encode("utf-8")
+            response.headers["Content-Type"] = "application/json"
+            response.url = request.url
+            response.request = request
+            return response
+
+        def close(self):
+            """Nothing to release"""
+            pass
+
+    def stub_llm(**kwargs):
+        """Build a chat model stand-in that returns a fixed suggestion"""
+        def respond(prompt):
+            counter.add("gemini")
+            delay()
+            return AIMessage(content="Carry a RAINCOAT - rain expected. Enjoy the ride!")
+        return RunnableLambda(respond)
+
+    # googlemaps.Client only checks the key's prefix; the client is replaced below
+    Config.GOOGLE_MAPS_API_KEY = "AIza-loadgen-stub"
+    service = gmaps_module.GoogleMapsService()
+    service.client = StubMapsClient()
+    gmaps_module._gmaps_service = service
+
+    resilience._session.mount("http://", StubHTTPAdapter())
+    resilience._session.mount("https://", StubHTTPAdapter())
+    Config.UBER_SERVER_TOKEN = "stub"
+    Config.OPENWEATHER_API_KEY = "stub"
+    Config.GEMINI_API_KEY = "stub"
+    travel_agent.ChatGoogleGenerativeAI = stub_llm
+
+
+def start_local_server():
+    """
+    Start the app in a background thread on a free local port
+
+    Returns:
+        tuple: (base_url, uvicorn.Server)
+    """
+    import uvicorn
+    from app.main import app
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("Local server failed to start")
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}/api", server
+
+
+class SessionRunner:
+    """Replays one rider session and records request latencies"""
+
+    def __init__(self, base_url: str, args: argparse.Namespace, picker: AddressPicker):
+        self.base_url = base_url
+        self.args = args
+        self.picker = picker
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors = Counter()
+        self.replayed = 0
+        self.sessions = 0
+        self.autocomplete_calls = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _http(self) -> requests.Session:
+        """Return this thread's HTTP session, creating it on first use"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _request(self, endpoint: str, method: str, url: str, **kwargs) -> Optional[requests.Response]:
+        """
+        Send a request and record its latency, errors and replay header
+
+        Returns:
+            requests.Response or None if the request failed to complete
+        """
+        started = time.monotonic()
+        try:
+            response = self._http().request(method, url, timeout=self.args.timeout, **kwargs)
+        except requests.RequestException:
+            with self._lock:
+                self.errors[endpoint] += 1
+            return None
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self.latencies[endpoint].append(elapsed)
+            if response.status_code >= 400:
+                self.errors[endpoint] += 1
+            if response.headers.get("Idempotent-Replayed") == "true":
+                self.replayed += 1
+        return response
+
+    def _keystroke_gap(self, rng: random.Random) -> float:
+        """Delay before the next keystroke; occasionally the rider pauses"""
+        if rng.random() < self.args.pause_probability:
+            return rng.uniform(0.4, 1.2)
+        return rng.expovariate(self.args.typing_cps)
+
+    def _type_address(self, address: str, rng: random.Random) -> Dict[str, Optional[str]]:
+        """
+        Type an address, fire debounced autocomplete calls and pick a result
+
+        Returns:
+            dict: The value to book with and the search's session token
+        """
+        session_token = None if self.args.free_text else f"{rng.getrandbits(64):016x}"
+        suggestions = []
+        typed = len(address) if rng.random() < 0.5 else rng.randint(
+            min(CLIENT_MIN_CHARS + 2, len(address)), len(address)
+        )
+        for i in range(1, typed + 1):
+            gap = self._keystroke_gap(rng) if i < typed else CLIENT_DEBOUNCE_SECONDS
+            if gap >= CLIENT_DEBOUNCE_SECONDS:
+                time.sleep(CLIENT_DEBOUNCE_SECONDS)
+                if i >= CLIENT_MIN_CHARS:
+                    params = {"input_text": address[:i]}
+                    if session_token:
+                        params["session_token"] = session_token
+                    response = self._request(
+                        "autocomplete", "GET", f"{self.base_url}/autocomplete", params=params
+                    )
+                    if response is not None and response.status_code == 200:
+                        suggestions = response.json().get("suggestions", [])
+                    with self._lock:
+                        self.autocomplete_calls += 1
+                time.sleep(gap - CLIENT_DEBOUNCE_SECONDS)
+            else:
+                time.sleep(gap)
+        # Reading the suggestions and tapping one
+        time.sleep(rng.uniform(0.3, 1.0) * self.args.think_scale)
+
+        selected = next((s for s in suggestions if s.get("description") == address), None)
+        if self.args.free_text or selected is None or not selected.get("place_id"):
+            return {"location": address, "session_token": None}
+
+        # The client resolves the selection right away, ending the Places session
+        self._request(
+            "place_details", "GET", f"{self.base_url}/place-details",
+            params={"place_id": selected["place_id"], "session_token": session_token}
+        )
+        return {"location": f"place_id:{selected['place_id']}", "session_token": session_token}
+
+    def run_session(self, seed: int):
+        """
+        Replay one rider session: type both addresses, then book the ride
+
+        Args:
+            seed: Seed for the session's own random choices
+        """
+        rng = random.Random(seed)
+        source, destination = self.picker.pick_pair()
+        source = self._type_address(source, rng)
+        destination = self._type_address(destination, rng)
+        body = {
+            "source": source["location"],
+            "destination": destination["location"],
+            "source_session_token": source["session_token"],
+            "destination_session_token": destination["session_token"],
+        }
+        self._request("book_ride", "POST", f"{self.base_url}/book-ride", json=body)
+        if rng.random() < self.args.retry_probability:
+            # Flaky-network retry of the same booking
+            self._request("book_ride", "POST", f"{self.base_url}/book-ride", json=body)
+        with self._lock:
+            self.sessions += 1
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(int(math.ceil(fraction * len(ordered))) - 1, len(ordered) - 1)]
+
+
+def build_report(
+    runner: SessionRunner,
+    elapsed: float,
+    upstream_calls: Optional[Dict[str, int]],
+    server_stats: Dict
+) -> Dict:
+    """Summarize a run into throughput, latency and efficiency figures"""
+    endpoints = {}
+    total_requests = 0
+    for endpoint, samples in sorted(runner.latencies.items()):
+        total_requests += len(samples)
+        endpoints[endpoint] = {
+            "requests": len(samples),
+            "errors": runner.errors[endpoint],
+            "p50_ms": round(percentile(samples, 0.50) * 1000, 1),
+            "p90_ms": round(percentile(samples, 0.90) * 1000, 1),
+            "p99_ms": round(percentile(samples, 0.99) * 1000, 1),
+            "max_ms": round(max(samples) * 1000, 1),
+        }
+
+    sessions = max(runner.sessions, 1)
+    caches = server_stats.get("caches") or {}
+    report = {
+        "sessions": runner.sessions,
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_rps": round(total_requests / elapsed, 2) if elapsed else 0.0,
+        "sessions_per_second": round(runner.sessions / elapsed, 2) if elapsed else 0.0,
+        "autocomplete_per_session": round(runner.autocomplete_calls / sessions, 2),
+        "endpoints": endpoints,
+        "cache": {
+            "booking_replays": runner.replayed,
+            "hot_routes": server_stats.get("hot_routes"),
+            "places": caches.get("places"),
+            "route_weather_tiles": caches.get("route_weather_tiles"),
+        },
+        "upstreams": server_stats.get("upstreams"),
+    }
+    if upstream_calls is not None:
+        report["upstream_calls"] = upstream_calls
+        report["upstream_calls_per_session"] = {
+            upstream: round(count / sessions, 2) for upstream, count in sorted(upstream_calls.items())
+        }
+        report["upstream_amplification"] = round(sum(upstream_calls.values()) / sessions, 2)
+    return report
+
+
+def fetch_server_stats(base_url: str) -> Dict:
+    """Collect cache and upstream metrics exposed by the server"""
+    stats = {}
+    for name, path in (("hot_routes", "/hot-routes"), ("caches", "/caches"), ("upstreams", "/upstreams")):
+        try:
+            response = requests.get(f"{base_url}{path}", timeout=5)
+            if response.status_code == 200:
+                stats[name] = response.json()
+        except requests.RequestException:
+            pass
+    if stats.get("hot_routes"):
+        stats["hot_routes"] = {
+            key: stats["hot_routes"][key]
+            for key in ("hits", "misses", "hit_ratio", "table_size")
+            if key in stats["hot_routes"]
+        }
+    return stats
+
+
+def print_report(report: Dict):
+    """Print a human-readable summary"""
+    print(f"Sessions: {report['sessions']} in {report['elapsed_seconds']}s "
+          f"({report['sessions_per_second']} sessions/s, {report['throughput_rps']} req/s)")
+    print(f"Autocomplete calls per session: {report['autocomplete_per_session']}")
+    print()
+    print(f"{'endpoint':<14}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for endpoint, row in report["endpoints"].items():
+        print(f"{endpoint:<14}{row['requests']:>10}{row['errors']:>8}{row['p50_ms']:>10}"
+              f"{row['p90_ms']:>10}{row['p99_ms']:>10}{row['max_ms']:>10}")
+    print()
+    cache = report["cache"]
+    print(f"Booking replays (idempotency): {cache['booking_replays']}")
+    if cache["hot_routes"]:
+        print(f"Hot routes: {cache['hot_routes']}")
+    if cache["places"]:
+        print(f"Place cache: {cache['places']}")
+    if cache["route_weather_tiles"]:
+        print(f"Route weather tiles: {cache['route_weather_tiles']}")
+    if "upstream_calls_per_session" in report:
+        print()
+        print(f"Upstream calls per session (amplification {report['upstream_amplification']}):")
+        for upstream, per_session in report["upstream_calls_per_session"].items():
+            print(f"  {upstream:<22}{per_session:>8}")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(
+        prog="python -m app.loadgen",
+        description="Replay realistic autocomplete + booking sessions against the API"
+    )
+    parser.add_argument("--url", help="API base URL, e.g. http://localhost:8000/api "
+                        "(default: start a local instance with stubbed upstreams)")
+    parser.add_argument("--sessions", type=int, default=100, help="Number of sessions to run")
+    parser.add_argument("--arrival-rate", type=float, default=5.0,
+                        help="Mean session arrivals per second (Poisson)")
+    parser.add_argument("--max-concurrent", type=int, default=200,
+                        help="Upper bound on concurrently active sessions")
+    parser.add_argument("--typing-cps", type=float, default=6.0,
+                        help="Mean typing speed in characters per second")
+    parser.add_argument("--pause-probability", type=float, default=0.08,
+                        help="Chance that a keystroke is followed by a pause longer than the debounce")
+    parser.add_argument("--think-scale", type=float, default=1.0,
+                        help="Multiplier on the time spent picking a suggestion")
+    parser.add_argument("--retry-probability", type=float, default=0.05,
+                        help="Chance that a booking is retried as if the network dropped")
+    parser.add_argument("--free-text", action="store_true",
+                        help="Book with the typed text instead of selected place IDs (pre-place_id client)")
+    parser.add_argument("--addresses", help="File with one address per line, most popular first")
+    parser.add_argument("--zipf", type=float, default=1.1,
+                        help="Zipf exponent of address popularity (0 for uniform)")
+    parser.add_argument("--upstream-latency-ms", type=float, default=80.0,
+                        help="Mean latency of stubbed upstream calls")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Client request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Run the load test and print its report"""
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+
+    addresses = DEFAULT_ADDRESSES
+    if args.addresses:
+        with open(args.addresses) as f:
+            addresses = [line.strip() for line in f if line.strip()]
+    if len(addresses) < 2:
+        raise SystemExit("At least two addresses are required")
+
+    counter = None
+    server = None
+    base_url = args.url
+    if base_url is None:
+        counter = UpstreamCounter()
+        install_stubs(counter, args.upstream_latency_ms / 1000, addresses)
+        base_url, server = start_local_server()
+    base_url = base_url.rstrip("/")
+
+    runner = SessionRunner(base_url, args, AddressPicker(addresses, args.zipf, rng))
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.max_concurrent) as pool:
+        for _ in range(args.sessions):
+            pool.submit(runner.run_session, rng.getrandbits(32))
+            time.sleep(rng.expovariate(args.arrival_rate))
+    elapsed = time.monotonic() - started
+
+    report = build_report(
+        runner,
+        elapsed,
+        counter.snapshot() if counter is not None else None,
+        fetch_server_stats(base_url)
+    )
+    if server is not None:
+        server.should_exit = True
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
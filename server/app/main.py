@@ -1,20 +1,88 @@
 """
 Main FastAPI application for Uber AI Clone
 """
+import asyncio
+import importlib.util
+from contextlib import asynccontextmanager
+import anyio.to_thread
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from app.api.routes import router
 from app.core.config import Config
+from app.core.gmaps import get_gmaps_service
+from app.core.hot_routes import get_hot_route_table
+from app.core.idempotency import get_idempotency_store
+from app.core.resilience import warm_connections
+from app.agents.travel_agent import OPENWEATHER_URL
+from app.core.uber_api import get_uber_service
 
 # Load environment variables
 load_dotenv()
 
+async def refresh_hot_routes():
+    """Periodically precompute the most frequently booked routes"""
+    table = get_hot_route_table()
+    while True:
+        await asyncio.sleep(Config.HOT_ROUTES_REFRESH_SECONDS)
+        try:
+            await run_in_threadpool(table.refresh)
+        except Exception as e:
+            print(f"Error refreshing hot routes: {e}")
+
+def warm_up():
+    """Create upstream clients, open their connections and precompute seeded hot routes"""
+    get_idempotency_store()
+    urls = []
+    uber_service = get_uber_service()
+    if Config.UBER_SERVER_TOKEN:
+        urls.append(uber_service.base_url)
+    if Config.OPENWEATHER_API_KEY:
+        urls.append(OPENWEATHER_URL)
+    try:
+        gmaps = get_gmaps_service()
+        urls.append(gmaps.client.base_url)
+    except ValueError as e:
+        print(f"Warning: {e}")
+        gmaps = None
+    warm_connections(urls)
+    if gmaps is None:
+        return
+    
+    if Config.HOT_ROUTES_ENABLED and Config.HOT_ROUTES_SEED:
+        table = get_hot_route_table()
+        for origin, destination in Config.HOT_ROUTES_SEED:
+            table.seed(origin, destination)
+        table.refresh()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up before serving, run background tasks, drain on shutdown"""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = Config.SERVER_THREADPOOL_SIZE
+    try:
+        await run_in_threadpool(warm_up)
+    except Exception as e:
+        print(f"Error during warm-up: {e}")
+    
+    hot_routes_task = None
+    if Config.HOT_ROUTES_ENABLED:
+        hot_routes_task = asyncio.create_task(refresh_hot_routes())
+    yield
+    if hot_routes_task is not None:
+        hot_routes_task.cancel()
+    
+    # Let bookings whose clients already disconnected finish their upstream work
+    unfinished = await get_idempotency_store().drain(Config.SERVER_GRACEFUL_SHUTDOWN_SECONDS)
+    if unfinished:
+        print(f"Warning: {unfinished} bookings still running at shutdown")
+
 # Create FastAPI app
 app = FastAPI(
     title="Uber AI Clone API",
     description="AI-powered ride booking service with travel suggestions",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -43,16 +111,45 @@ async def root():
             "products": "/api/products",
             "price_estimates": "/api/price-estimates",
             "time_estimates": "/api/time-estimates",
-            "autocomplete": "/api/autocomplete"
+            "autocomplete": "/api/autocomplete",
+            "place_details": "/api/place-details",
+            "hot_routes": "/api/hot-routes",
+            "caches": "/api/caches",
+            "upstreams": "/api/upstreams"
         }
     }
 
-if __name__ == "__main__":
+def _module_available(name: str) -> bool:
+    """Whether an optional module can be imported"""
+    return importlib.util.find_spec(name) is not None
+
+def serve():
+    """Run the server in the mode selected by SERVER_MODE"""
     import uvicorn
     Config.validate()
+    
+    if not Config.is_production():
+        uvicorn.run(
+            "app.main:app",
+            host=Config.SERVER_HOST,
+            port=Config.SERVER_PORT,
+            reload=True
+        )
+        return
+    
+    # uvloop and httptools ship with uvicorn[standard]; fall back if absent
     uvicorn.run(
         "app.main:app",
         host=Config.SERVER_HOST,
         port=Config.SERVER_PORT,
-        reload=True
-    )
\ No newline at end of file
+        workers=Config.server_workers(),
+        loop="uvloop" if _module_available("uvloop") else "asyncio",
+        http="httptools" if _module_available("httptools") else "h11",
+        backlog=Config.SERVER_BACKLOG,
+        timeout_keep_alive=Config.SERVER_KEEPALIVE_SECONDS,
+        timeout_graceful_shutdown=Config.SERVER_GRACEFUL_SHUTDOWN_SECONDS,
+        access_log=Config.SERVER_ACCESS_LOG
+    )
+
+if __name__ == "__main__":
+    serve()
\ No newline at end of file